@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+
+"""
+Simple content-addressed cache for files produced by the data
+generation pipeline (e.g. the relaxed magnetisation state).
+
+Cache entries are keyed by a hash of the inputs which determine the
+cached files, so that a matching entry can be re-used across runs
+and output directories. The total size of the cache is bounded;
+when it grows beyond the limit the least recently used entries are
+evicted.
+
+The cache can also be used from the command line, which is how the
+data generation scripts use it:
+
+    python artifact_cache.py fetch relax.omf relaxation_stage.mif
+    python artifact_cache.py store relax.omf relaxation_stage.mif
+
+The first argument is the cached file, all remaining arguments are
+the input files which determine its contents. `fetch` exits with
+status 1 if there is no matching cache entry.
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser('~'), '.cache', 'fmr-standard-problem')
+DEFAULT_MAX_SIZE = 500 * 1024**2  # 500 MB
+
+_CHUNK_SIZE = 1024**2
+
+
+def _update_hash_from_file(h, filename):
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            h.update(chunk)
+
+
+def hash_inputs(filenames, params=None):
+    """
+    Return a hex digest which uniquely identifies the contents of the
+    given input files together with the (optional) dictionary `params`.
+
+    Only the file contents enter the hash (not the file names or paths),
+    so that identical inputs in different directories map to the same key.
+    """
+    h = hashlib.sha256()
+    for filename in filenames:
+        _update_hash_from_file(h, filename)
+        h.update(b'\0')
+    _update_hash_from_params(h, params)
+    return h.hexdigest()
+
+
+def hash_arrays(arrays, params=None):
+    """
+    Return a hex digest which uniquely identifies the given numpy arrays
+    (their dtype, shape and contents) together with the (optional)
+    dictionary `params`.
+
+    This is the counterpart of `hash_inputs` for data which has already
+    been loaded, so that it does not need to be read a second time.
+    """
+    h = hashlib.sha256()
+    for a in arrays:
+        if not a.flags.c_contiguous:
+            a = a.copy(order='C')
+        h.update('{}{}\0'.format(a.dtype.str, a.shape).encode('utf-8'))
+        h.update(a.data)
+        h.update(b'\0')
+    _update_hash_from_params(h, params)
+    return h.hexdigest()
+
+
+def _update_hash_from_params(h, params):
+    for name in sorted(params or {}):
+        h.update('{}={!r}\0'.format(name, params[name]).encode('utf-8'))
+
+
+class ArtifactCache(object):
+    """
+    Directory-based cache which stores a set of files per key.
+
+    Each entry lives in its own subdirectory `<cache_dir>/<key>`. The
+    modification time of an entry's directory is updated whenever it
+    is accessed and is used to decide which entries to evict first
+    once the total size exceeds `max_size` (in bytes).
+
+    The attributes `hits` and `misses` count the successful and failed
+    calls to `fetch`, respectively.
+    """
+    def __init__(self, cache_dir=None, max_size=None):
+        if cache_dir is None:
+            cache_dir = os.environ.get('FMR_CACHE_DIR', DEFAULT_CACHE_DIR)
+        if max_size is None:
+            max_size = int(os.environ.get('FMR_CACHE_MAX_SIZE', DEFAULT_MAX_SIZE))
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def contains(self, key):
+        return os.path.isdir(self._entry_dir(key))
+
+    def fetch(self, key, filenames, dest_dir='.'):
+        """
+        Copy the cached files with the given names into `dest_dir`.
+
+        Returns True if the cache contains an entry for `key` with all
+        of the requested files, and False otherwise (including the case
+        that the entry is evicted by another process while copying).
+        """
+        entry_dir = self._entry_dir(key)
+        sources = [os.path.join(entry_dir, os.path.basename(f)) for f in filenames]
+        try:
+            if not all(os.path.isfile(src) for src in sources):
+                raise IOError("Incomplete cache entry: {}".format(key))
+            for src in sources:
+                shutil.copy(src, os.path.join(dest_dir, os.path.basename(src)))
+            os.utime(entry_dir, None)
+        except (IOError, OSError):
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def store(self, key, filenames):
+        """
+        Store copies of the given files in the cache under `key` and
+        evict old entries if the cache has grown beyond its size limit.
+
+        Since entries are content-addressed, an existing entry for `key`
+        (e.g. one stored concurrently by another process with the same
+        inputs) is kept as it is.
+        """
+        entry_dir = self._entry_dir(key)
+        # Write to a temporary directory first so that concurrent readers
+        # never see a partially written entry.
+        tmp_dir = '{}.tmp-{}'.format(entry_dir, os.getpid())
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        try:
+            for filename in filenames:
+                shutil.copy(filename, os.path.join(tmp_dir, os.path.basename(filename)))
+            if not os.path.isdir(entry_dir):
+                try:
+                    os.rename(tmp_dir, entry_dir)
+                except OSError:
+                    # Another process has stored the same entry in the meantime.
+                    if not os.path.isdir(entry_dir):
+                        raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict(keep=key)
+
+    def entries(self):
+        """
+        Return a list of tuples `(last_access_time, size_in_bytes, key)`
+        for all entries in the cache.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        result = []
+        for key in os.listdir(self.cache_dir):
+            entry_dir = self._entry_dir(key)
+            if '.tmp-' in key or not os.path.isdir(entry_dir):
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(entry_dir, f))
+                           for f in os.listdir(entry_dir))
+                result.append((os.path.getmtime(entry_dir), size, key))
+            except OSError:
+                # The entry has been evicted by another process.
+                continue
+        return result
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used entries until the total size of the
+        cache is below `max_size`. The entry `keep` (if given) is never
+        removed, even if it alone exceeds the size limit.
+        """
+        entries = sorted(self.entries())
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total_size <= self.max_size:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total_size -= size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fetch or store files in the content-addressed artifact cache.")
+    parser.add_argument("action", choices=['fetch', 'store'])
+    parser.add_argument("artifact", help="Name of the cached file")
+    parser.add_argument("inputs", nargs='+',
+                        help="Input files which determine the cached file")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Cache directory (default: $FMR_CACHE_DIR or "
+                             "'{}')".format(DEFAULT_CACHE_DIR))
+    args = parser.parse_args(argv)
+
+    cache = ArtifactCache(cache_dir=args.cache_dir)
+    key = hash_inputs(args.inputs)
+
+    if args.action == 'fetch':
+        if cache.fetch(key, [args.artifact]):
+            print("Using cached '{}' (key {})".format(args.artifact, key[:12]))
+            return 0
+        return 1
+    else:
+        cache.store(key, [args.artifact])
+        print("Stored '{}' in cache (key {})".format(args.artifact, key[:12]))
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,7 @@
+import json
 import numpy as np
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 
 def _convert_to_unit(val, unit):
@@ -13,6 +15,86 @@ def _convert_to_unit(val, unit):
         raise ValueError(msg)
 
 
+def iter_load_arrays(filenames, max_workers=None, mmap_mode=None, lookahead=None):
+    """
+    Load the `.npy` files with the given names in a pool of background
+    threads and yield the resulting arrays in the order of `filenames`.
+
+    While the caller processes one array, the next `lookahead` ones are
+    already being read from disk. By default all loads are started
+    immediately; pass a small `lookahead` to bound the number of arrays
+    held in memory when iterating over many large files.
+    """
+    filenames = list(filenames)
+    n = len(filenames)
+    if lookahead is None:
+        lookahead = n
+    executor = ThreadPoolExecutor(max_workers=max_workers or max(1, min(n, lookahead + 1)))
+    futures = {}
+
+    def submit(i):
+        if i < n:
+            futures[i] = executor.submit(np.load, filenames[i], mmap_mode=mmap_mode)
+
+    try:
+        for i in range(min(n, lookahead + 1)):
+            submit(i)
+        for i in range(n):
+            yield futures.pop(i).result()
+            submit(i + lookahead + 1)
+    finally:
+        for future in futures.values():
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def zoom_dft(x, fmin, fmax, num, dt, axis=0):
+    """
+    Evaluate the discrete Fourier transform of `x` along `axis` on `num`
+    equally spaced frequencies between `fmin` and `fmax` (inclusive), i.e.
+
+        X_k = sum_n x_n exp(-2 pi i f_k n dt),   f_k = fmin + k * df,
+
+    using the chirp-z transform (Bluestein's algorithm). For frequencies
+    on the FFT grid the result agrees with `numpy.fft.rfft`, but the
+    frequencies can be spaced arbitrarily densely. The cost is that of
+    FFTs of length `N + num - 1` (where N is the length of `x` along
+    `axis`), independent of the frequency resolution, whereas zero-padding
+    to the same resolution would need FFTs of length `1 / (df * dt)`.
+
+    The units of the frequencies and of `dt` must match (e.g. Hz and s,
+    or GHz and ns). The frequency axis of the result replaces `axis`.
+    """
+    x = np.moveaxis(np.asarray(x), axis, -1)
+    n = x.shape[-1]
+    df = (fmax - fmin) / (num - 1) if num > 1 else 0.0
+    L = 2**int(np.ceil(np.log2(n + num - 1)))
+
+    # Bluestein's identity n * k = (n^2 + k^2 - (k - n)^2) / 2 turns the
+    # transform into a convolution with the chirp exp(i pi df dt j^2).
+    nn = np.arange(n)
+    kk = np.arange(num)
+    y = x * np.exp(-2j * np.pi * dt * (fmin * nn + 0.5 * df * nn**2))
+    v = np.zeros(L, dtype=complex)
+    v[:num] = np.exp(1j * np.pi * df * dt * kk**2)
+    v[L - n + 1:] = np.exp(1j * np.pi * df * dt * np.arange(-(n - 1), 0)**2)
+    X = np.fft.ifft(np.fft.fft(y, L) * np.fft.fft(v))[..., :num]
+    X *= np.exp(-1j * np.pi * df * dt * kk**2)
+    return np.moveaxis(X, -1, axis)
+
+
+def _rfft_in_chunks(m, out, chunk_size):
+    """
+    Internal helper function to write the FFT along the first axis of the
+    3D array `m` to `out`, transforming blocks of rows (along the second
+    axis) of roughly `chunk_size` bytes each.
+    """
+    n, nx, ny = m.shape
+    rows_per_chunk = max(1, chunk_size // (16 * n * ny))
+    for i in range(0, nx, rows_per_chunk):
+        out[:, i:i + rows_per_chunk] = np.fft.rfft(m[:, i:i + rows_per_chunk], axis=0)
+
+
 class DataReader(object):
     """
     This class facilitates loading of raw data (as produced
@@ -77,19 +159,67 @@ class DataReader(object):
         idx = self._get_index_of_m_avg_component(component)
         return self.data_avg[:, idx]
 
-    def get_spatially_resolved_magnetisation(self, component):
+    def get_spatially_resolved_magnetisation_filename(self, component):
+        """
+        Return the name of the file `m{x,y,z}s.npy` containing the
+        spatially resolved magnetisation of the given component.
+        """
+        return os.path.join(self.data_dir, 'm{}s.npy'.format(component))
+
+    def _get_spectral_index_filename(self, component):
+        return os.path.join(self.data_dir, 'm{}s_rfft.npy'.format(component))
+
+    def _get_spectral_index_source_filename(self, component):
+        return os.path.join(self.data_dir, 'm{}s_rfft.json'.format(component))
+
+    def _get_source_identity(self, component):
+        """
+        Internal helper function to return a dictionary identifying the
+        current contents of the spatially resolved magnetisation data for
+        the given component (size, modification time and array shape).
+        Only the file's metadata and .npy header are read.
+        """
+        filename = self.get_spatially_resolved_magnetisation_filename(component)
+        st = os.stat(filename)
+        shape = np.load(filename, mmap_mode='r').shape
+        return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'shape': list(shape)}
+
+    def get_spatially_resolved_magnetisation(self, component, mmap_mode=None):
         """
         Return a numpy array of shape (N, nx, ny) containing the values
         of the spatially resolved magnetization sampled at all N timesteps
         the simulation. The time dimension is along the first axis - i.e.,
         `m[:, i, j]` is the time series of the magnetisation at the grid
         point (i, j).
+
+        If `mmap_mode` is given (e.g. 'r'), the data is memory-mapped
+        rather than read into memory (see `numpy.load`).
         """
-        filename = os.path.join(self.data_dir, 'm{}s.npy'.format(component))
-        m = np.load(filename)
+        filename = self.get_spatially_resolved_magnetisation_filename(component)
+        m = np.load(filename, mmap_mode=mmap_mode)
         assert m.ndim == 3
         return m
 
+    def iter_spatially_resolved_magnetisation(self, components=('x', 'y', 'z'), max_workers=None,
+                                              lookahead=None):
+        """
+        Yield pairs `(component, m)` where `m` is the spatially resolved
+        magnetisation of the given component (as returned by
+        `get_spatially_resolved_magnetisation`).
+
+        The data for the requested components is loaded concurrently in
+        background threads, so any computation performed on one component
+        overlaps with reading the data for the next one. By default all
+        components are loaded at once; `lookahead` limits the number of
+        components loaded ahead of the one being consumed (see
+        `iter_load_arrays`).
+        """
+        filenames = [self.get_spatially_resolved_magnetisation_filename(c) for c in components]
+        loaded = iter_load_arrays(filenames, max_workers=max_workers, lookahead=lookahead)
+        for component, m in zip(components, loaded):
+            assert m.ndim == 3
+            yield component, m
+
     def get_fft_frequencies(self, unit='Hz'):
         if unit == 'Hz':
             timestep_unit = 's'
@@ -127,16 +257,125 @@ class DataReader(object):
         fft_coeffs = np.fft.rfft(m_vals, axis=0)
         return fft_coeffs
 
-    def get_FFT_coeffs_of_spatially_resolved_m(self, component):
-        m_vals = self.get_spatially_resolved_magnetisation(component)
-        fft_coeffs = np.fft.rfft(m_vals, axis=0)
+    def get_FFT_coeffs_of_spatially_resolved_m(self, component, chunk_size=None):
+        """
+        Return the FFT coefficients (along the time axis) of the spatially
+        resolved magnetisation as an array of shape (N//2 + 1, nx, ny).
+
+        If `chunk_size` is given, the data is memory-mapped and transformed
+        in blocks of grid rows of roughly `chunk_size` bytes each, so that
+        only the result (but not the full magnetisation history and the
+        intermediate arrays of the transform) is held in memory.
+        """
+        if chunk_size is None:
+            m_vals = self.get_spatially_resolved_magnetisation(component)
+            fft_coeffs = np.fft.rfft(m_vals, axis=0)
+            return fft_coeffs
+        m = self.get_spatially_resolved_magnetisation(component, mmap_mode='r')
+        n, nx, ny = m.shape
+        fft_coeffs = np.empty((n // 2 + 1, nx, ny), dtype=np.complex128)
+        _rfft_in_chunks(m, fft_coeffs, chunk_size)
         return fft_coeffs
 
+    def build_spectral_index(self, components=('x', 'y', 'z'), chunk_size=64 * 1024**2):
+        """
+        Write the FFT coefficients of the spatially resolved magnetisation
+        to the files `m{x,y,z}s_rfft.npy` in the data directory.
+
+        The coefficients are stored in frequency-major order, i.e. as an
+        array of shape (N//2 + 1, nx, ny), so that the mode for a single
+        frequency is one contiguous block of `nx * ny` values which can be
+        read from the memory-mapped file without touching the rest of the
+        data. Once the index exists it is used automatically by
+        `get_FFT_coeffs_for_frequency` (and hence `get_mode_amplitudes`
+        and `get_mode_phases`) until the source data `m?s.npy` changes.
+        To detect this, the size, modification time and shape of the
+        source are recorded alongside the index in `m{x,y,z}s_rfft.json`.
+
+        The transform is computed in blocks of grid rows whose size is
+        chosen such that each block needs roughly `chunk_size` bytes, so
+        the full magnetisation history is never held in memory.
+        """
+        for component in components:
+            source_identity = self._get_source_identity(component)
+            m = self.get_spatially_resolved_magnetisation(component, mmap_mode='r')
+            n, nx, ny = m.shape
+
+            # Remove the record of the old source first, so that an
+            # interrupted rebuild never pairs it with a new index (or
+            # vice versa).
+            source_filename = self._get_spectral_index_source_filename(component)
+            if os.path.isfile(source_filename):
+                os.remove(source_filename)
+
+            filename = self._get_spectral_index_filename(component)
+            tmp_filename = filename + '.tmp'
+            index = np.lib.format.open_memmap(
+                tmp_filename, mode='w+', dtype=np.complex128, shape=(n // 2 + 1, nx, ny))
+            _rfft_in_chunks(m, index, chunk_size)
+            index.flush()
+            del index
+            os.rename(tmp_filename, filename)
+
+            with open(source_filename + '.tmp', 'w') as f:
+                json.dump(source_identity, f)
+            os.rename(source_filename + '.tmp', source_filename)
+
+    def get_spectral_index(self, component):
+        """
+        Return the memory-mapped spectral index (see `build_spectral_index`)
+        for the given component, or None if it does not exist or
+        does not match the current spatially resolved magnetisation data
+        (i.e. the source has been modified or replaced since the index
+        was built, even by a file with an older modification time).
+        """
+        filename = self._get_spectral_index_filename(component)
+        source_filename = self._get_spectral_index_source_filename(component)
+        source = self.get_spatially_resolved_magnetisation_filename(component)
+        if not (os.path.isfile(filename) and os.path.isfile(source_filename)):
+            return None
+        if os.path.getmtime(filename) < os.path.getmtime(source):
+            return None
+        with open(source_filename) as f:
+            source_identity = json.load(f)
+        if source_identity != self._get_source_identity(component):
+            return None
+        index = np.load(filename, mmap_mode='r')
+        n, nx, ny = source_identity['shape']
+        if index.shape != (n // 2 + 1, nx, ny):
+            return None
+        return index
+
     def get_FFT_coeffs_for_frequency(self, freq, component):
-        fft_coeffs = self.get_FFT_coeffs_of_spatially_resolved_m(component)
         idx = self.find_freq_index(freq)
+        index = self.get_spectral_index(component)
+        if index is not None:
+            return np.array(index[idx])
+        fft_coeffs = self.get_FFT_coeffs_of_spatially_resolved_m(component)
         return fft_coeffs[idx, :]
 
+    def get_FFT_coeffs_for_frequency_of_components(self, freq, components=('x', 'y', 'z')):
+        """
+        Return a list with the FFT coefficients at frequency `freq` for
+        each of the given magnetisation components (in the same order).
+
+        This is equivalent to calling `get_FFT_coeffs_for_frequency` for
+        each component, but the data for the next component which is not
+        covered by the spectral index is loaded while the current one is
+        transformed (so at most two components are held in memory).
+        """
+        idx = self.find_freq_index(freq)
+        result = {}
+        for component in components:
+            index = self.get_spectral_index(component)
+            if index is not None:
+                result[component] = np.array(index[idx])
+        missing = [c for c in components if c not in result]
+        for component, m in self.iter_spatially_resolved_magnetisation(missing, lookahead=1):
+            # Copy the coefficients so that the full transform can be freed.
+            result[component] = np.array(np.fft.rfft(m, axis=0)[idx, :])
+        return [result[c] for c in components]
+
     def get_mode_amplitudes(self, freq, component):
         fft_coeffs_mode = self.get_FFT_coeffs_for_frequency(freq, component)
         return np.absolute(fft_coeffs_mode)
@@ -208,3 +447,93 @@ class DataReader(object):
         psd_data_avg = np.mean(psd_data_full, axis=(1, 2))
         # FIXME: We ignore the last element for now so that we can compare with the existing data.
         return psd_data_avg[:-1]
+
+    def _get_dt_for_frequency_unit(self, unit):
+        """
+        Internal helper function to return the timestep in the time unit
+        matching the frequency unit `unit` ('Hz' or 'GHz').
+        """
+        if unit == 'Hz':
+            return self.get_dt(unit='s')
+        elif unit == 'GHz':
+            return self.get_dt(unit='ns')
+        else:
+            raise ValueError("Invalid unit: '{}'. Allowed values: 'Hz', 'GHz'".format(unit))
+
+    def get_zoom_frequencies(self, fmin, fmax, num):
+        """
+        Return the `num` equally spaced frequencies between `fmin` and `fmax`
+        (inclusive) at which the zoom spectra are evaluated.
+        """
+        return np.linspace(fmin, fmax, num)
+
+    def get_zoom_FFT_coeffs_of_average_m(self, component, fmin, fmax, num, unit='Hz',
+                                         subtract_mean=True):
+        """
+        Return the Fourier coefficients of the spatially averaged
+        magnetisation at the frequencies `get_zoom_frequencies(fmin, fmax, num)`.
+
+        These agree with `get_FFT_coeffs_of_average_m` on the FFT grid
+        but can be evaluated on an arbitrarily fine grid within the band
+        `[fmin, fmax]` (see `zoom_dft`).
+
+        By default the time average of the magnetisation is subtracted
+        first. This only changes the coefficient at f = 0 on the FFT grid,
+        but between grid points the static magnetisation would otherwise
+        leak into the spectrum and swamp the resonance peaks.
+        """
+        m_vals = self.get_average_magnetisation(component)
+        if subtract_mean:
+            m_vals = m_vals - m_vals.mean()
+        dt = self._get_dt_for_frequency_unit(unit)
+        return zoom_dft(m_vals, fmin, fmax, num, dt)
+
+    def get_zoom_FFT_coeffs_of_spatially_resolved_m(self, component, fmin, fmax, num,
+                                                    unit='Hz', subtract_mean=True,
+                                                    chunk_size=64 * 1024**2):
+        """
+        Return an array of shape (num, nx, ny) with the Fourier coefficients
+        of the spatially resolved magnetisation at the frequencies
+        `get_zoom_frequencies(fmin, fmax, num)`.
+
+        The data is processed in blocks of grid rows of about `chunk_size`
+        bytes each. Using `num=1` and `fmin=fmax=f` yields the mode at an
+        arbitrary frequency `f`, not necessarily on the FFT grid. See
+        `get_zoom_FFT_coeffs_of_average_m` for the meaning of `subtract_mean`
+        (here the time average is subtracted for each cell).
+        """
+        m = self.get_spatially_resolved_magnetisation(component, mmap_mode='r')
+        n, nx, ny = m.shape
+        dt = self._get_dt_for_frequency_unit(unit)
+        L = 2**int(np.ceil(np.log2(n + num - 1)))
+        rows_per_chunk = max(1, chunk_size // (16 * L * ny))
+
+        coeffs = np.empty((num, nx, ny), dtype=complex)
+        for i in range(0, nx, rows_per_chunk):
+            m_vals = np.asarray(m[:, i:i + rows_per_chunk])
+            if subtract_mean:
+                m_vals = m_vals - m_vals.mean(axis=0)
+            coeffs[:, i:i + rows_per_chunk] = zoom_dft(m_vals, fmin, fmax, num, dt)
+        return coeffs
+
+    def get_zoom_spectrum_via_method_1(self, component, fmin, fmax, num, unit='Hz',
+                                       subtract_mean=True):
+        """
+        Return the power spectral density of the spatially averaged
+        magnetisation (as in `get_spectrum_via_method_1`) at the frequencies
+        `get_zoom_frequencies(fmin, fmax, num)`.
+        """
+        coeffs = self.get_zoom_FFT_coeffs_of_average_m(
+            component, fmin, fmax, num, unit=unit, subtract_mean=subtract_mean)
+        return np.abs(coeffs)**2
+
+    def get_zoom_spectrum_via_method_2(self, component, fmin, fmax, num, unit='Hz',
+                                       subtract_mean=True):
+        """
+        Return the power spectral density of the spatially resolved
+        magnetisation (as in `get_spectrum_via_method_2`) at the frequencies
+        `get_zoom_frequencies(fmin, fmax, num)`.
+        """
+        coeffs = self.get_zoom_FFT_coeffs_of_spatially_resolved_m(
+            component, fmin, fmax, num, unit=unit, subtract_mean=subtract_mean)
+        return np.mean(np.abs(coeffs)**2, axis=(1, 2))
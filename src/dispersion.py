@@ -0,0 +1,214 @@
+"""
+Spin-wave dispersion analysis.
+
+The functions in this module compute the space-time Fourier transform of
+the spatially resolved magnetisation, i.e. a real FFT over time combined
+with a complex FFT over both spatial axes, and extract the dispersion
+relation (power as a function of frequency and wave vector) along chosen
+directions in k-space.
+
+The spatial transform uses the opposite sign in the exponent to the
+temporal one, so that a plane wave `cos(k.r - 2 pi f t)` (travelling in
+the direction of `k`) shows up at the positive frequency `f` and at the
+wave vector `+k`.
+
+The temporal transform is taken from the frequency-major spectral index
+written by `DataReader.build_spectral_index`, and the spatial transforms
+are then applied to blocks of frequencies read from the memory-mapped
+index. This keeps the memory use bounded by the block size, independent
+of the length of the simulation.
+
+If the index does not exist, it is only written to the data directory if
+requested with `build_index=True` (and if the directory is writable).
+Otherwise the temporal transform is computed in memory, in blocks of
+grid rows, which needs about as much memory as the magnetisation data.
+
+Spatial axes are referred to as in the data written by the postprocessing
+scripts, i.e. `m[:, j, i]` is the magnetisation in the cell with index `i`
+in x-direction and `j` in y-direction.
+"""
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.colors import LogNorm
+
+
+def _get_spatial_window(window, shape):
+    """
+    Internal helper function to return the spatial window of the given
+    shape as a 2D array (or None if no window should be applied).
+    """
+    if window is None:
+        return None
+    if isinstance(window, str):
+        try:
+            window_func = {'hann': np.hanning, 'hamming': np.hamming,
+                           'blackman': np.blackman}[window]
+        except KeyError:
+            raise ValueError(
+                "Unknown window: '{}'. Allowed values: 'hann', 'hamming', "
+                "'blackman' (or an array of shape {}).".format(window, shape))
+        return np.outer(window_func(shape[0]), window_func(shape[1]))
+    window = np.asarray(window, dtype=float)
+    if window.shape != tuple(shape):
+        raise ValueError("Window has shape {}, expected {}.".format(window.shape, shape))
+    return window
+
+
+def _get_k_line(direction, shape):
+    """
+    Internal helper function to return the indices `(idx_y, idx_x)` of the
+    2D FFT coefficients on the line through k = 0 along `direction`, as well
+    as the number of steps along that line (relative to the origin) of each
+    point, sorted in ascending order.
+
+    The direction can be 'x', 'y' or a pair of integers `(a, b)`, meaning
+    that the line consists of the wave vectors `s * (a * dk_x, b * dk_y)`.
+    """
+    ny, nx = shape
+    if direction == 'x':
+        direction = (1, 0)
+    elif direction == 'y':
+        direction = (0, 1)
+    a, b = (int(v) for v in direction)
+    if (a, b) == (0, 0):
+        raise ValueError("Invalid direction: {}".format(direction))
+
+    # Only use as many steps as give distinct wave vectors on the grid.
+    n = min(n_axis // abs(v) for n_axis, v in [(nx, a), (ny, b)] if v != 0)
+    steps = np.arange(-(n // 2), n - n // 2)
+    return (steps * b) % ny, (steps * a) % nx, steps
+
+
+def compute_space_time_spectrum(data_reader, component, window=None,
+                                chunk_size=64 * 1024**2, out=None, build_index=False):
+    """
+    Return the space-time FFT coefficients of the spatially resolved
+    magnetisation as an array of shape (N//2 + 1, ny, nx), where the first
+    axis corresponds to the frequencies `numpy.fft.rfftfreq(N, dt)` and
+    the spatial axes to the wave vectors returned by `get_k_vectors`.
+
+    This is equivalent to
+
+        nx * ny * numpy.fft.ifft2(numpy.fft.rfft(w * m, axis=0), axes=(1, 2))
+
+    where `w` is the (optional) spatial `window` ('hann', 'hamming',
+    'blackman' or a 2D array), but is computed in blocks of about
+    `chunk_size` bytes.
+    If `out` is given (e.g. a memory-mapped array of the right shape) the
+    result is written into it, so the full spectrum never needs to fit
+    into memory. If `build_index` is True, a missing spectral index is
+    written to the data directory first (see the module docstring).
+    """
+    coeffs_t = _get_temporal_coefficients(data_reader, component, build_index, chunk_size)
+    num_freqs, ny, nx = coeffs_t.shape
+    w = _get_spatial_window(window, (ny, nx))
+
+    if out is None:
+        out = np.empty((num_freqs, ny, nx), dtype=complex)
+    for start, stop, block in _iter_space_time_blocks(coeffs_t, w, chunk_size):
+        out[start:stop] = block
+    return out
+
+
+def get_k_vectors(n, cellsize):
+    """
+    Return the wave vectors (in rad/m) of an FFT of length `n` over
+    cells of size `cellsize`, in FFT order.
+    """
+    return 2 * np.pi * np.fft.fftfreq(n, cellsize)
+
+
+def get_dispersion(data_reader, component='y', direction='x', window=None,
+                   cellsize=(5e-9, 5e-9), chunk_size=64 * 1024**2, build_index=False):
+    """
+    Return a triple `(freqs, k, power)` describing the spin-wave dispersion
+    along the given direction in k-space ('x', 'y' or a pair of integers,
+    see `_get_k_line`).
+
+    `freqs` are the frequencies in Hz, `k` the (signed) magnitudes of the
+    wave vectors along the line in rad/m (in ascending order) and `power`
+    is an array of shape (len(freqs), len(k)) with the squared magnitudes
+    of the space-time FFT coefficients. The grid spacing is given by
+    `cellsize = (dx, dy)` in metres.
+
+    Only one block of frequencies is transformed and held in memory at a
+    time (see `compute_space_time_spectrum`, also for `build_index`).
+    """
+    coeffs_t = _get_temporal_coefficients(data_reader, component, build_index, chunk_size)
+    num_freqs, ny, nx = coeffs_t.shape
+    w = _get_spatial_window(window, (ny, nx))
+    idx_y, idx_x, steps = _get_k_line(direction, (ny, nx))
+
+    power = np.empty((num_freqs, len(steps)))
+    for start, stop, block in _iter_space_time_blocks(coeffs_t, w, chunk_size):
+        power[start:stop] = np.abs(block[:, idx_y, idx_x])**2
+
+    kx = get_k_vectors(nx, cellsize[0])[idx_x]
+    ky = get_k_vectors(ny, cellsize[1])[idx_y]
+    k = np.sign(steps) * np.sqrt(kx**2 + ky**2)
+    freqs = np.fft.rfftfreq(data_reader.get_num_timesteps(), data_reader.get_dt())
+    return freqs, k, power
+
+
+def plot_dispersion(freqs, k, power, ax=None, fmax=None, cmap='inferno'):
+    """
+    Plot the dispersion returned by `get_dispersion` (frequency in GHz
+    against wave vector in rad/um, with a logarithmic colour scale).
+    Returns the matplotlib figure.
+    """
+    if ax is None:
+        fig = plt.figure(figsize=(7, 5.5))
+        ax = fig.add_subplot(1, 1, 1)
+    else:
+        fig = ax.figure
+
+    power = np.where(power > 0, power, np.nan)
+    ax.pcolormesh(k * 1e-6, freqs * 1e-9, power, cmap=cmap, shading='nearest',
+                  norm=LogNorm(vmin=np.nanmax(power) * 1e-8, vmax=np.nanmax(power)))
+    ax.set_xlabel('Wave vector (rad/um)')
+    ax.set_ylabel('Frequency (GHz)')
+    if fmax is not None:
+        ax.set_ylim([0, fmax * 1e-9])
+    return fig
+
+
+def _get_temporal_coefficients(data_reader, component, build_index, chunk_size):
+    """
+    Internal helper function to return the temporal FFT coefficients of
+    the given component. These are memory-mapped from the spectral index
+    if it exists (or if it is built because `build_index` is True) and
+    computed in memory otherwise.
+    """
+    index = data_reader.get_spectral_index(component)
+    if index is None and build_index:
+        try:
+            data_reader.build_spectral_index([component], chunk_size=chunk_size)
+            index = data_reader.get_spectral_index(component)
+        except (IOError, OSError):
+            # E.g. a read-only data directory; fall back to the in-memory transform.
+            pass
+    if index is None:
+        return data_reader.get_FFT_coeffs_of_spatially_resolved_m(component, chunk_size=chunk_size)
+    return index
+
+
+def _iter_space_time_blocks(coeffs_t, w, chunk_size):
+    """
+    Internal helper function to apply the (windowed) spatial transform to
+    the temporal FFT coefficients `coeffs_t` in blocks of frequencies of
+    about `chunk_size` bytes. Yields triples `(start, stop, block)`, where
+    `block` holds the space-time FFT coefficients for `coeffs_t[start:stop]`.
+    """
+    num_freqs, ny, nx = coeffs_t.shape
+    for start, stop in _iter_chunks(num_freqs, chunk_size // (16 * nx * ny)):
+        block = np.asarray(coeffs_t[start:stop])
+        if w is not None:
+            block = block * w
+        yield start, stop, nx * ny * np.fft.ifft2(block, axes=(1, 2))
+
+
+def _iter_chunks(n, chunk_length):
+    chunk_length = max(1, int(chunk_length))
+    for start in range(0, n, chunk_length):
+        yield start, min(start + chunk_length, n)
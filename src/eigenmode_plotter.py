@@ -79,13 +79,18 @@ class EigenmodePlotter(object):
                                      height_ratios=[4, 4])
         axes = [fig.add_subplot(g) for g in gs]
 
-        amp_x = self.data_reader.get_mode_amplitudes(freq, 'x').reshape(self.shape)
-        amp_y = self.data_reader.get_mode_amplitudes(freq, 'y').reshape(self.shape)
-        amp_z = self.data_reader.get_mode_amplitudes(freq, 'z').reshape(self.shape)
-
-        phase_x = self.data_reader.get_mode_phases(freq, 'x').reshape(self.shape)
-        phase_y = self.data_reader.get_mode_phases(freq, 'y').reshape(self.shape)
-        phase_z = self.data_reader.get_mode_phases(freq, 'z').reshape(self.shape)
+        # Load the data for all three components concurrently and compute
+        # the FFT coefficients only once per component.
+        coeffs_x, coeffs_y, coeffs_z = \
+            self.data_reader.get_FFT_coeffs_for_frequency_of_components(freq, ['x', 'y', 'z'])
+
+        amp_x = np.absolute(coeffs_x).reshape(self.shape)
+        amp_y = np.absolute(coeffs_y).reshape(self.shape)
+        amp_z = np.absolute(coeffs_z).reshape(self.shape)
+
+        phase_x = np.angle(coeffs_x).reshape(self.shape)
+        phase_y = np.angle(coeffs_y).reshape(self.shape)
+        phase_z = np.angle(coeffs_z).reshape(self.shape)
 
         # Ensure that all three amplitude plots are on the same scale:
         minVal = np.min([amp_x, amp_y, amp_z])
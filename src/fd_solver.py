@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+
+"""
+Finite-difference micromagnetic solver written in (vectorized) numpy.
+
+This allows generating data for the FMR standard problem without an
+external micromagnetic package. It implements the same physics as the
+OOMMF scripts in `oommf_scripts/`: exchange, demagnetisation (computed
+via FFT using Newell's demag tensor), a uniform Zeeman field and the
+Landau-Lifshitz-Gilbert equation, integrated with a fixed-step classical
+Runge-Kutta (RK4) scheme.
+
+Usage:
+
+    python fd_solver.py generate [--output-dir DIR]
+    python fd_solver.py benchmark
+
+The first command runs the relaxation and dynamic stage with the
+parameters from `relaxation_stage.mif` and `dynamic_stage.mif` and writes
+the files `dynamic_txyz.txt` and `m{x,y,z}s.npy` in the same layout as
+the OOMMF scripts, so that the results can be read with `DataReader`.
+The relaxed state is cached across runs (see `artifact_cache.py`).
+The second command reports the throughput of the solver in cell-steps
+per second.
+"""
+
+import argparse
+import numpy as np
+import os
+import shutil
+import tempfile
+import time
+from artifact_cache import ArtifactCache, hash_inputs
+
+mu0 = 4e-7 * np.pi
+
+# Parameters of the standard problem (cf. relaxation_stage.mif and
+# dynamic_stage.mif in the directory oommf_scripts/).
+SAMPLE_SIZE = (120e-9, 120e-9, 10e-9)
+CELL_SIZE = (5e-9, 5e-9, 5e-9)
+Ms = 8.0e5  # saturation magnetisation (A/m)
+gamma = 2.210173e5  # gyromagnetic ratio (m/As)
+
+RELAXATION_PARAMS = dict(A=1.3e-11, alpha=1.0, T=5e-9, m0=(0.0, 0.0, 1.0),
+                         H_ext=8e4 * np.array([0.813405448449, 0.581697151818, 0.0]))
+DYNAMIC_PARAMS = dict(A=13e-12, alpha=0.008, dt=5e-12, num_timesteps=4000,
+                      H_ext=8e4 * np.array([0.819152044289, 0.573576436351, 0.0]))
+
+
+def _nan_to_zero(a):
+    """
+    Internal helper function to replace NaN entries by zero. These arise
+    in the terms of Newell's functions whose prefactor vanishes exactly
+    where the remaining factor is undefined.
+    """
+    a[np.isnan(a)] = 0.0
+    return a
+
+
+def _newell_f(x, y, z):
+    x, y, z = np.abs(x), np.abs(y), np.abs(z)
+    x2, y2, z2 = x**2, y**2, z**2
+    R = np.sqrt(x2 + y2 + z2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = (_nan_to_zero(0.5 * y * (z2 - x2) * np.arcsinh(y / np.sqrt(x2 + z2)))
+                  + _nan_to_zero(0.5 * z * (y2 - x2) * np.arcsinh(z / np.sqrt(x2 + y2)))
+                  - _nan_to_zero(x * y * z * np.arctan(y * z / (x * R)))
+                  + (2 * x2 - y2 - z2) * R / 6.0)
+    return result
+
+
+def _newell_g(x, y, z):
+    x2, y2, z2 = x**2, y**2, z**2
+    R = np.sqrt(x2 + y2 + z2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = (_nan_to_zero(x * y * z * np.arcsinh(z / np.sqrt(x2 + y2)))
+                  + _nan_to_zero(y / 6.0 * (3 * z2 - y2) * np.arcsinh(x / np.sqrt(y2 + z2)))
+                  + _nan_to_zero(x / 6.0 * (3 * z2 - x2) * np.arcsinh(y / np.sqrt(x2 + z2)))
+                  - _nan_to_zero(z * z2 / 6.0 * np.arctan(x * y / (z * R)))
+                  - _nan_to_zero(z * y2 / 2.0 * np.arctan(x * z / (y * R)))
+                  - _nan_to_zero(z * x2 / 2.0 * np.arctan(y * z / (x * R)))
+                  - x * y * R / 3.0)
+    return result
+
+
+def _second_difference(func, X, Y, Z, dx, dy, dz):
+    """
+    Internal helper function to apply the product of the 1D second
+    difference operators `2 f(s) - f(s + ds) - f(s - ds)` along all three
+    coordinate directions to `func` (cf. Newell et al., JGR 98, 9551 (1993)).
+    """
+    weights = {-1: -1.0, 0: 2.0, 1: -1.0}
+    result = np.zeros_like(X)
+    for i, wi in weights.items():
+        for j, wj in weights.items():
+            for k, wk in weights.items():
+                result += wi * wj * wk * func(X + i * dx, Y + j * dy, Z + k * dz)
+    return result
+
+
+def demag_tensor(shape, cellsize):
+    """
+    Return a dict with the six independent components ('xx', 'yy', 'zz',
+    'xy', 'xz', 'yz') of the demag tensor of a grid of cuboid cells.
+
+    `shape` is the grid shape `(nz, ny, nx)` and `cellsize` the cell size
+    `(dx, dy, dz)`. Each component is an array of shape (2 nz, 2 ny, 2 nx)
+    which contains the tensor for all cell offsets in FFT order (i.e.,
+    negative offsets are wrapped around), ready for computing the demag
+    field as a zero-padded convolution. The demag field is `H = -N M`.
+    """
+    nz, ny, nx = shape
+    # The tensor is scale invariant, so we work in units of dx to avoid
+    # problems with the very small numbers involved in SI units.
+    dx, dy, dz = np.asarray(cellsize, dtype=float) / cellsize[0]
+
+    def offsets(n, d):
+        idx = np.arange(2 * n)
+        return np.where(idx < n, idx, idx - 2 * n) * d
+
+    Z, Y, X = np.meshgrid(offsets(nz, dz), offsets(ny, dy), offsets(nx, dx), indexing='ij')
+    prefactor = 1.0 / (4 * np.pi * dx * dy * dz)
+
+    def f_yxz(x, y, z):
+        return _newell_f(y, x, z)
+
+    def f_zyx(x, y, z):
+        return _newell_f(z, y, x)
+
+    def g_xzy(x, y, z):
+        return _newell_g(x, z, y)
+
+    def g_yzx(x, y, z):
+        return _newell_g(y, z, x)
+
+    N = {}
+    N['xx'] = prefactor * _second_difference(_newell_f, X, Y, Z, dx, dy, dz)
+    N['yy'] = prefactor * _second_difference(f_yxz, X, Y, Z, dx, dy, dz)
+    N['zz'] = prefactor * _second_difference(f_zyx, X, Y, Z, dx, dy, dz)
+    N['xy'] = prefactor * _second_difference(_newell_g, X, Y, Z, dx, dy, dz)
+    N['xz'] = prefactor * _second_difference(g_xzy, X, Y, Z, dx, dy, dz)
+    N['yz'] = prefactor * _second_difference(g_yzx, X, Y, Z, dx, dy, dz)
+
+    # Offsets of +/- n cells never contribute to the demag field inside the
+    # sample. Setting them to zero makes the tensor components exactly even
+    # or odd, so that their Fourier transforms are real.
+    for key in N:
+        N[key][nz] = 0
+        N[key][:, ny] = 0
+        N[key][:, :, nx] = 0
+    return N
+
+
+def _cross(a, b):
+    """
+    Internal helper function to compute the cross product of two vector
+    fields whose components are stored along the first axis.
+    """
+    return np.array([a[1] * b[2] - a[2] * b[1],
+                     a[2] * b[0] - a[0] * b[2],
+                     a[0] * b[1] - a[1] * b[0]])
+
+
+class Simulation(object):
+    """
+    Finite-difference simulation of a cuboid ferromagnetic sample.
+
+    The magnetisation is stored in `self.m` as an array of shape
+    (3, nz, ny, nx), i.e. the x-index varies fastest, as in OOMMF's
+    output files.
+    """
+    def __init__(self, shape, cellsize, Ms, A, alpha, H_ext, gamma=gamma, m0=(0, 0, 1)):
+        self.shape = tuple(shape)
+        self.cellsize = tuple(cellsize)
+        self.Ms = Ms
+        self.A = A
+        self.alpha = alpha
+        self.gamma = gamma
+        self.H_ext = np.asarray(H_ext, dtype=float).reshape(3, 1, 1, 1)
+        self.t = 0.0
+
+        m0 = np.asarray(m0, dtype=float)
+        if m0.shape == (3,):
+            m0 = m0.reshape(3, 1, 1, 1) * np.ones((3,) + self.shape)
+        self.m = m0 / np.sqrt(np.sum(m0**2, axis=0))
+
+        padded_shape = tuple(2 * n for n in self.shape)
+        self._padded_shape = padded_shape
+        N = demag_tensor(self.shape, self.cellsize)
+        self._N_fft = dict((key, np.fft.rfftn(N[key]).real) for key in N)
+
+    @property
+    def num_cells(self):
+        return int(np.prod(self.shape))
+
+    def exchange_field(self, m):
+        """
+        Return the exchange field (in A/m) for the magnetisation `m`,
+        using Neumann boundary conditions at the sample surfaces.
+        """
+        lap = np.zeros_like(m)
+        # Axes 1, 2, 3 of `m` correspond to z, y, x, respectively. Each
+        # difference between neighbouring cells contributes to both cells.
+        for axis, d in zip([1, 2, 3], self.cellsize[::-1]):
+            if m.shape[axis] < 2:
+                continue
+            lower = [slice(None)] * 4
+            upper = [slice(None)] * 4
+            lower[axis] = slice(None, -1)
+            upper[axis] = slice(1, None)
+            diff = (m[tuple(upper)] - m[tuple(lower)]) / d**2
+            lap[tuple(lower)] += diff
+            lap[tuple(upper)] -= diff
+        return 2 * self.A / (mu0 * self.Ms) * lap
+
+    def demag_field(self, m):
+        """
+        Return the demagnetisation field (in A/m) for the magnetisation `m`.
+        """
+        s = self._padded_shape
+        axes = (1, 2, 3)
+        Mx, My, Mz = np.fft.rfftn(self.Ms * m, s=s, axes=axes)
+        N = self._N_fft
+        H = np.array([N['xx'] * Mx + N['xy'] * My + N['xz'] * Mz,
+                      N['xy'] * Mx + N['yy'] * My + N['yz'] * Mz,
+                      N['xz'] * Mx + N['yz'] * My + N['zz'] * Mz])
+        nz, ny, nx = self.shape
+        return -np.fft.irfftn(H, s=s, axes=axes)[:, :nz, :ny, :nx]
+
+    def effective_field(self, m):
+        return self.exchange_field(m) + self.demag_field(m) + self.H_ext
+
+    def dm_dt(self, m):
+        """
+        Right hand side of the Landau-Lifshitz-Gilbert equation.
+        """
+        H = self.effective_field(m)
+        mxH = _cross(m, H)
+        mxmxH = _cross(m, mxH)
+        return -self.gamma / (1 + self.alpha**2) * (mxH + self.alpha * mxmxH)
+
+    def step(self, h):
+        """
+        Advance the magnetisation by one RK4 step of size `h` (in seconds).
+        """
+        m = self.m
+        k1 = self.dm_dt(m)
+        k2 = self.dm_dt(m + 0.5 * h * k1)
+        k3 = self.dm_dt(m + 0.5 * h * k2)
+        k4 = self.dm_dt(m + h * k3)
+        m = m + h / 6.0 * (k1 + 2 * k2 + 2 * k3 + k4)
+        self.m = m / np.sqrt(np.sum(m**2, axis=0))
+        self.t += h
+
+    def advance(self, T, max_step=5e-13):
+        """
+        Advance the magnetisation by the time `T` (in seconds), using
+        equal RK4 steps of at most `max_step`.
+        """
+        num_steps = int(np.ceil(T / max_step - 1e-9))
+        for _ in range(num_steps):
+            self.step(T / num_steps)
+
+    def average_magnetisation(self):
+        return self.m.mean(axis=(1, 2, 3))
+
+
+def _grid_shape(sample_size=SAMPLE_SIZE, cellsize=CELL_SIZE):
+    """
+    Return the grid shape (nz, ny, nx) for the given sample and cell size.
+    """
+    nx, ny, nz = (int(round(L / d)) for L, d in zip(sample_size, cellsize))
+    return (nz, ny, nx)
+
+
+def relax(cache=None, max_step=5e-13):
+    """
+    Run the relaxation stage and return the relaxed magnetisation as an
+    array of shape (3, nz, ny, nx).
+
+    The result is looked up in (and stored to) the given `ArtifactCache`,
+    keyed by the relaxation parameters and the source of this module.
+    """
+    if cache is None:
+        cache = ArtifactCache()
+    params = dict(RELAXATION_PARAMS, sample_size=SAMPLE_SIZE, cellsize=CELL_SIZE,
+                  Ms=Ms, gamma=gamma, max_step=max_step)
+    params['H_ext'] = tuple(params['H_ext'])
+    key = hash_inputs([os.path.abspath(__file__).replace('.pyc', '.py')], params=params)
+
+    filename = 'relax.npy'
+    # The scratch directory must live outside the cache, otherwise it could
+    # be evicted by `cache.store` while it is still in use.
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        if cache.fetch(key, [filename], dest_dir=tmp_dir):
+            print("Using cached relaxed state (key {})".format(key[:12]))
+            return np.load(os.path.join(tmp_dir, filename))
+
+        p = RELAXATION_PARAMS
+        sim = Simulation(_grid_shape(), CELL_SIZE, Ms=Ms, A=p['A'], alpha=p['alpha'],
+                         H_ext=p['H_ext'], m0=p['m0'])
+        sim.advance(p['T'], max_step=max_step)
+        np.save(os.path.join(tmp_dir, filename), sim.m)
+        cache.store(key, [os.path.join(tmp_dir, filename)])
+        return sim.m
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def run_dynamic_stage(output_dir, m0, num_timesteps=None, max_step=5e-13):
+    """
+    Run the dynamic stage starting from the magnetisation `m0` and write
+    the files `dynamic_txyz.txt` and `m{x,y,z}s.npy` to `output_dir`.
+
+    The spatially resolved data is averaged over the layers in z-direction
+    and written as arrays of shape (N, ny, nx), matching the output of
+    `oommf_scripts/oommf_postprocessing.py`.
+    """
+    p = DYNAMIC_PARAMS
+    num_timesteps = num_timesteps or p['num_timesteps']
+    nz, ny, nx = _grid_shape()
+    sim = Simulation((nz, ny, nx), CELL_SIZE, Ms=Ms, A=p['A'], alpha=p['alpha'],
+                     H_ext=p['H_ext'], m0=m0)
+
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    m_full = [np.lib.format.open_memmap(
+                  os.path.join(output_dir, 'm{}s.npy'.format(c)), mode='w+',
+                  dtype=float, shape=(num_timesteps, ny, nx))
+              for c in 'xyz']
+    data_avg = np.zeros((num_timesteps, 4))
+
+    for i in range(num_timesteps):
+        sim.advance(p['dt'], max_step=max_step)
+        data_avg[i, 0] = (i + 1) * p['dt']
+        data_avg[i, 1:] = sim.average_magnetisation()
+        m_layer_avg = sim.m.mean(axis=1)
+        for j in range(3):
+            m_full[j][i] = m_layer_avg[j]
+
+    for m in m_full:
+        m.flush()
+    header = ("Columns: Simulation time (s), mx, my, mz\n"
+              "Generated by src/fd_solver.py")
+    np.savetxt(os.path.join(output_dir, 'dynamic_txyz.txt'), data_avg, header=header)
+
+
+def generate_data(output_dir, num_timesteps=None, max_step=5e-13, cache=None):
+    """
+    Run the relaxation and dynamic stage of the standard problem and write
+    the resulting data to `output_dir`.
+    """
+    m_relaxed = relax(cache=cache, max_step=max_step)
+    run_dynamic_stage(output_dir, m_relaxed, num_timesteps=num_timesteps, max_step=max_step)
+
+
+def benchmark(num_steps=100, shape=None, max_step=5e-13):
+    """
+    Time `num_steps` RK4 steps of the dynamic stage and return the
+    throughput in cell-steps per second.
+    """
+    shape = shape or _grid_shape()
+    p = DYNAMIC_PARAMS
+    sim = Simulation(shape, CELL_SIZE, Ms=Ms, A=p['A'], alpha=p['alpha'],
+                     H_ext=p['H_ext'], m0=(1, 1, 0))
+    sim.step(max_step)  # warm-up
+    start = time.time()
+    for _ in range(num_steps):
+        sim.step(max_step)
+    elapsed = time.time() - start
+    return sim.num_cells * num_steps / elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Finite-difference solver for the FMR standard problem")
+    subparsers = parser.add_subparsers(dest='command')
+
+    parser_generate = subparsers.add_parser('generate', help="Generate data")
+    parser_generate.add_argument("--output-dir", default='../data-generated/numpy',
+                                 help="Output directory (default: %(default)s)")
+    parser_generate.add_argument("--num-timesteps", type=int, default=None,
+                                 help="Number of timesteps saved in the dynamic stage "
+                                      "(default: {})".format(DYNAMIC_PARAMS['num_timesteps']))
+
+    parser_benchmark = subparsers.add_parser('benchmark', help="Measure solver throughput")
+    parser_benchmark.add_argument("--num-steps", type=int, default=100)
+
+    args = parser.parse_args()
+    if args.command == 'generate':
+        generate_data(args.output_dir, num_timesteps=args.num_timesteps)
+    elif args.command == 'benchmark':
+        throughput = benchmark(num_steps=args.num_steps)
+        print("{:.3g} cell-steps per second ({} cells, RK4)".format(
+            throughput, int(np.prod(_grid_shape()))))
+    else:
+        parser.print_help()
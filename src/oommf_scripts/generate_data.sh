@@ -9,8 +9,15 @@
 # The generated data will be placed in the directory given by the
 # environment variable OUTPUT_DIR (if not specified then the default
 # value '../../data-generated/oommf' is used).
+#
+# The relaxed state is kept in a local cache keyed by the contents of
+# 'relaxation_stage.mif' (see 'src/artifact_cache.py'), so that repeated
+# runs with unchanged relaxation inputs skip straight to the dynamic
+# stage. The cache location and size limit can be set via the environment
+# variables FMR_CACHE_DIR and FMR_CACHE_MAX_SIZE (in bytes).
 
 OUTPUT_DIR=${OUTPUT_DIR:-../../data-generated/oommf}
+ARTIFACT_CACHE="$(cd "$(dirname "$0")/.." && pwd)/artifact_cache.py"
 TIMESTAMP=$(date)
 OOMMF_SCRIPTS="relaxation_stage.mif dynamic_stage.mif oommf_postprocessing.py"
 
@@ -51,9 +58,14 @@ echo "The data in this directory was automatically generated on $TIMESTAMP
 by the script 'src/oommf_scripts/generate_data_oommf.sh' in this repository.
 It can safely be deleted if it is no longer needed." > README.txt
 
-# Run the relaxation stage.
-tclsh $OOMMFTCL boxsi +fg relaxation_stage.mif -exitondone 1
-mv relax-*omf relax.omf
+# Run the relaxation stage (unless a matching relaxed state is cached).
+if python "$ARTIFACT_CACHE" fetch relax.omf relaxation_stage.mif; then
+    echo "Skipping relaxation stage."
+else
+    tclsh $OOMMFTCL boxsi +fg relaxation_stage.mif -exitondone 1
+    mv relax-*omf relax.omf
+    python "$ARTIFACT_CACHE" store relax.omf relaxation_stage.mif
+fi
 
 # Run the dynamic stage.
 tclsh $OOMMFTCL boxsi +fg dynamic_stage.mif -exitondone 1
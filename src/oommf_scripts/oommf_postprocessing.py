@@ -1,51 +1,120 @@
+"""
+Extract the spatially resolved magnetisation from the .omf files written
+by OOMMF during the dynamic stage and store it in the files `mxs.npy`,
+`mys.npy`, `mzs.npy` as arrays of shape NUM_TIMESTEPS x ny x nx.
+
+The mesh dimensions are read from the header of the .omf files. By default
+the magnetisation is averaged over all layers in z-direction; alternatively
+a single layer can be selected (`--layer K`). With `--per-layer` every
+layer is additionally written to its own set of files `m{x,y,z}s_layer{K}.npy`
+(e.g. for the analysis of thickness modes). Each snapshot is reduced as soon
+as it has been read, so the full 3D history is never held in memory.
+"""
+
+import argparse
 import glob
 import numpy as np
 
-omf_files = sorted(glob.glob('dynamic*.omf'))
-
-nx = 24
-ny = 24
-
-# Read magnetisation snapshots from all .omf files
-# and store them in three arrays `mxs`, `mys`, `mzs`
-# of shape NUM_TIMESTEPS x NUM_CELLS.
-mxs = []
-mys = []
-mzs = []
-
-for omf_file in omf_files:
-    d = np.loadtxt(omf_file)
-    mxs.append(d[:, 0])
-    mys.append(d[:, 1])
-    mzs.append(d[:, 2])
-
-mxs = np.array(mxs)
-mys = np.array(mys)
-mzs = np.array(mzs)
-
-
-# Compute the average of the magnetisation values in the
-# top and bottom layer of the sample. Note that the way we
-# compute this relies on the fact that OOMMF orders the
-# magnetisation values such that the z-index is incremented
-# last (see [1], section "Data block").
-#
-# [1] http://math.nist.gov/oommf/doc/userguide12a6/userguide/OVF_1.0_format.html
-
-_, numMags = mxs.shape
-numMagsPerLayer = numMags // 2
-
-mxsTop = mxs[:, :numMagsPerLayer]
-mysTop = mys[:, :numMagsPerLayer]
-mzsTop = mzs[:, :numMagsPerLayer]
-mxsBottom = mxs[:, numMagsPerLayer:]
-mysBottom = mys[:, numMagsPerLayer:]
-mzsBottom = mzs[:, numMagsPerLayer:]
-
-mxs_sampled = 0.5 * (mxsTop + mxsBottom).reshape((-1, nx, ny))
-mys_sampled = 0.5 * (mysTop + mysBottom).reshape((-1, nx, ny))
-mzs_sampled = 0.5 * (mzsTop + mzsBottom).reshape((-1, nx, ny))
-
-np.save('mxs.npy', mxs_sampled)
-np.save('mys.npy', mys_sampled)
-np.save('mzs.npy', mzs_sampled)
+
+def read_ovf_header(filename):
+    """
+    Return a dictionary with the fields of the header of the given OVF file
+    (e.g. 'xnodes', 'ynodes', 'znodes'). Keys are converted to lower case;
+    values are returned as strings.
+    """
+    header = {}
+    with open(filename) as f:
+        for line in f:
+            if not line.startswith('#'):
+                break
+            line = line.lstrip('#').strip()
+            if line.lower().startswith('begin: data'):
+                break
+            if ':' in line:
+                key, value = line.split(':', 1)
+                header[key.strip().lower()] = value.strip()
+    return header
+
+
+def get_mesh_dimensions(filename):
+    """
+    Return the number of cells `(nx, ny, nz)` of the mesh in the given OVF file.
+    """
+    header = read_ovf_header(filename)
+    try:
+        return tuple(int(header[key]) for key in ['xnodes', 'ynodes', 'znodes'])
+    except KeyError as e:
+        raise ValueError("Could not find {} in the header of '{}'.".format(e, filename))
+
+
+def read_snapshot(filename, nx, ny, nz):
+    """
+    Return the magnetisation stored in the given (text-based) OVF file as
+    an array of shape (3, nz, ny, nx). This relies on the fact that OOMMF
+    orders the magnetisation values such that the x-index is incremented
+    first and the z-index last (see [1], section "Data block").
+
+    [1] http://math.nist.gov/oommf/doc/userguide12a6/userguide/OVF_1.0_format.html
+    """
+    d = np.loadtxt(filename)
+    return d.reshape(nz, ny, nx, 3).transpose(3, 0, 1, 2)
+
+
+def extract_spatial_data(omf_files, layer='mean', per_layer=False, prefix=''):
+    """
+    Read the magnetisation snapshots from `omf_files` and write the files
+    `{prefix}m{x,y,z}s.npy` containing, for each timestep, either the average
+    over all layers in z-direction (`layer='mean'`) or the layer with the
+    given index. If `per_layer` is True, the files `{prefix}m{x,y,z}s_layer{K}.npy`
+    are written for each layer K as well.
+
+    The output arrays are filled snapshot by snapshot via memory-mapped
+    files, so that only a single snapshot is held in memory at any time.
+    """
+    nx, ny, nz = get_mesh_dimensions(omf_files[0])
+    if layer != 'mean' and not -nz <= layer < nz:
+        raise ValueError(
+            "Invalid layer index {} for a mesh with {} layers.".format(layer, nz))
+
+    def create_output(filename):
+        return np.lib.format.open_memmap(filename, mode='w+', dtype=float,
+                                         shape=(len(omf_files), ny, nx))
+
+    ms = [create_output('{}m{}s.npy'.format(prefix, c)) for c in 'xyz']
+    ms_layers = []
+    if per_layer:
+        ms_layers = [[create_output('{}m{}s_layer{}.npy'.format(prefix, c, k)) for k in range(nz)]
+                     for c in 'xyz']
+
+    for i, omf_file in enumerate(omf_files):
+        if get_mesh_dimensions(omf_file) != (nx, ny, nz):
+            raise ValueError("Mesh of '{}' differs from that of '{}'.".format(
+                omf_file, omf_files[0]))
+        m = read_snapshot(omf_file, nx, ny, nz)
+        m_reduced = m.mean(axis=1) if layer == 'mean' else m[:, layer]
+        for j in range(3):
+            ms[j][i] = m_reduced[j]
+        for j, m_layers in enumerate(ms_layers):
+            for k in range(nz):
+                m_layers[k][i] = m[j, k]
+
+    for m in ms + sum(ms_layers, []):
+        m.flush()
+
+
+def _layer_argument(value):
+    return value if value == 'mean' else int(value)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Extract the spatially resolved magnetisation from OOMMF's .omf files.")
+    parser.add_argument("--layer", type=_layer_argument, default='mean',
+                        help="Either 'mean' (average over all layers in z-direction) "
+                             "or the index of a single layer (default: %(default)s)")
+    parser.add_argument("--per-layer", action="store_true",
+                        help="Additionally write the files m{x,y,z}s_layer{K}.npy for each layer")
+    args = parser.parse_args()
+
+    omf_files = sorted(glob.glob('dynamic*.omf'))
+    extract_spatial_data(omf_files, layer=args.layer, per_layer=args.per_layer)
@@ -12,13 +12,66 @@ from data_reader import DataReader
 from eigenmode_plotter import EigenmodePlotter
 
 
-def make_figure2(data_reader, component='y'):
+def decimate_for_plot(x, y, xlim, num_pixels):
+    """
+    Reduce the curve given by `x` and `y` to the points which are needed
+    to draw it at a horizontal resolution of `num_pixels` across the range
+    `xlim`, without visibly changing the plot.
+
+    Only the points inside `xlim` (plus one on either side, so that the
+    curve still extends to the edges of the axes) are kept. If there are
+    many more of them than pixels, they are split into `num_pixels` bins
+    and only the minimum and maximum of each bin is retained, so that all
+    peaks survive. Otherwise the data is returned unchanged. The values in
+    `x` are assumed to be sorted and (roughly) evenly spaced.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    i_start = max(np.searchsorted(x, xlim[0]) - 1, 0)
+    i_end = min(np.searchsorted(x, xlim[1], side='right') + 1, len(x))
+    n = i_end - i_start
+
+    num_bins = max(int(num_pixels), 1)
+    if n <= 4 * num_bins:
+        return x, y
+
+    x = x[i_start:i_end]
+    y = y[i_start:i_end]
+
+    # Pad the data with its last value so that it splits into equal bins.
+    bin_size = -(-n // num_bins)
+    num_bins = -(-n // bin_size)
+    y_padded = np.concatenate([y, np.repeat(y[-1:], num_bins * bin_size - n)])
+    y_binned = y_padded.reshape(num_bins, bin_size)
+
+    offsets = np.arange(num_bins) * bin_size
+    idx = np.concatenate([[0, n - 1],
+                          offsets + np.argmin(y_binned, axis=1),
+                          offsets + np.argmax(y_binned, axis=1)])
+    idx = np.unique(np.minimum(idx, n - 1))
+    return x[idx], y[idx]
+
+
+def _get_num_pixels(fig, dpi=None):
+    """
+    Return the width of `fig` in pixels at the given resolution (which
+    defaults to the figure's own dpi). This is an upper bound for the
+    number of pixels across any of its axes.
+    """
+    return fig.get_figwidth() * (dpi or fig.dpi)
+
+
+def make_figure2(data_reader, component='y', dpi=None):
     """
     Create Fig. 2 in the paper.
 
     Returns a matplotlib figure with two subfigures showing (a) the ringdown
     dynamics of the spatially averaged y-component of the magnetisation, m_y,
     and (b) the power spectrum obtained from a Fourier transform of m_y.
+
+    Long time series are decimated to the resolution at which the figure
+    will be saved, which can be specified via `dpi` (this defaults to the
+    figure's dpi).
     """
     # Read timesteps and spatially averaged magnetisation (y-component).
     ts = data_reader.get_timesteps(unit='ns')
@@ -32,6 +85,10 @@ def make_figure2(data_reader, component='y'):
     # Plot magnetisation dynamics and power spectrum into two subplots.
     fig, (ax1, ax2) = plt.subplots(nrows=2, ncols=1, figsize=(8, 6))
 
+    num_pixels = _get_num_pixels(fig, dpi)
+    ts, mys = decimate_for_plot(ts, mys, [0, 2.5], num_pixels)
+    freqs, psd = decimate_for_plot(freqs, psd, [0.1, 20], num_pixels)
+
     ax1.plot(ts, mys)
     ax1.set_xlabel('Time (ns)')
     ax1.set_ylabel('Magnetisation in Y')
@@ -48,13 +105,16 @@ def make_figure2(data_reader, component='y'):
     return fig
 
 
-def make_figure3(data_reader, component='y'):
+def make_figure3(data_reader, component='y', dpi=None):
     """
     Create Fig. 3 in the paper.
 
     Returns a matplotlib figure with two curves for the power
     spectral densities of the magnetisation dynamics computed
     via method 1 and 2 (as described in section C1 and C2).
+
+    Long spectra are decimated to the resolution given by `dpi`
+    (see `make_figure2`).
     """
     dt = data_reader.get_dt()
 
@@ -70,8 +130,11 @@ def make_figure3(data_reader, component='y'):
     # Plot both power spectra into the same figure
     fig = plt.figure(figsize=(7, 5.5))
     ax = fig.add_subplot(1, 1, 1)
-    ax.plot(freqs, psd1, label='Spatially Averaged')
-    ax.plot(freqs, psd2, color='g', lw=2, label='Spatially Resolved')
+    num_pixels = _get_num_pixels(fig, dpi)
+    freqs1, psd1 = decimate_for_plot(freqs, psd1, [0.2, 20], num_pixels)
+    freqs2, psd2 = decimate_for_plot(freqs, psd2, [0.2, 20], num_pixels)
+    ax.plot(freqs1, psd1, label='Spatially Averaged')
+    ax.plot(freqs2, psd2, color='g', lw=2, label='Spatially Resolved')
     ax.set_xlabel('Frequency (GHz)')
     ax.set_ylabel('Spectral density')
     ax.set_xlim([0.2, 20])
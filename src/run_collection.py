@@ -0,0 +1,193 @@
+import numpy as np
+from data_reader import DataReader, iter_load_arrays
+
+
+class RunCollection(object):
+    """
+    This class bundles several simulation runs (e.g. the individual
+    points of a field sweep) which were sampled with the same timestep
+    on the same grid, and provides batched access to their data and
+    power spectra.
+
+    The data of all runs is stacked along a new first axis, so that e.g.
+    `get_average_magnetisation('y')[r]` is the averaged m_y of run `r`.
+    Stacked arrays are only assembled when first requested and are
+    then kept for subsequent calls.
+    """
+    def __init__(self, data_dirs, software, params=None):
+        """
+        Open the runs in `data_dirs` (all produced by `software`).
+
+        The optional argument `params` contains the value of the swept
+        parameter for each run (e.g. the bias field strength); if it is
+        not given the runs are simply numbered.
+        """
+        self.data_readers = [DataReader(d, software) for d in data_dirs]
+        if len(self.data_readers) == 0:
+            raise ValueError("A RunCollection needs at least one run.")
+
+        if params is None:
+            params = np.arange(len(self.data_readers))
+        self.params = np.asarray(params)
+        if len(self.params) != len(self.data_readers):
+            raise ValueError(
+                "Number of parameter values ({}) does not match the number "
+                "of runs ({}).".format(len(self.params), len(self.data_readers)))
+
+        self._check_runs_are_compatible()
+        self._stacked = {}
+
+    def __len__(self):
+        return len(self.data_readers)
+
+    @staticmethod
+    def _get_grid_shape(data_reader):
+        """
+        Internal helper function to return the spatial grid shape of a
+        run, or None if it does not contain spatially resolved data.
+        """
+        try:
+            m = data_reader.get_spatially_resolved_magnetisation('x', mmap_mode='r')
+        except IOError:
+            return None
+        return m.shape[1:]
+
+    def _check_runs_are_compatible(self):
+        ref = self.data_readers[0]
+        ref_n = ref.get_num_timesteps()
+        ref_dt = ref.get_dt()
+        ref_shape = self._get_grid_shape(ref)
+
+        for data_reader in self.data_readers[1:]:
+            if data_reader.get_num_timesteps() != ref_n:
+                raise ValueError(
+                    "Run '{}' has {} timesteps, expected {}.".format(
+                        data_reader.data_dir, data_reader.get_num_timesteps(), ref_n))
+            if not np.isclose(data_reader.get_dt(), ref_dt, rtol=1e-6, atol=0):
+                raise ValueError(
+                    "Run '{}' has timestep {} s, expected {} s.".format(
+                        data_reader.data_dir, data_reader.get_dt(), ref_dt))
+            shape = self._get_grid_shape(data_reader)
+            if shape != ref_shape:
+                raise ValueError(
+                    "Run '{}' has grid shape {}, expected {}.".format(
+                        data_reader.data_dir, shape, ref_shape))
+
+    def get_timesteps(self, unit='s'):
+        return self.data_readers[0].get_timesteps(unit=unit)
+
+    def get_dt(self, unit='s'):
+        return self.data_readers[0].get_dt(unit=unit)
+
+    def get_fft_frequencies(self, unit='Hz'):
+        return self.data_readers[0].get_fft_frequencies(unit=unit)
+
+    def get_average_magnetisation(self, component):
+        """
+        Return a numpy array of shape (R, N) containing the spatially
+        averaged magnetisation of all R runs at the N timesteps.
+        """
+        key = ('avg', component)
+        if key not in self._stacked:
+            self._stacked[key] = np.array(
+                [d.get_average_magnetisation(component) for d in self.data_readers])
+        return self._stacked[key]
+
+    def get_spatially_resolved_magnetisation(self, component):
+        """
+        Return a numpy array of shape (R, N, nx, ny) containing the
+        spatially resolved magnetisation of all R runs.
+
+        Note that this holds the data of all runs in memory. The spectra
+        computed by this class do not require it.
+        """
+        key = ('full', component)
+        if key not in self._stacked:
+            filenames = [d.get_spatially_resolved_magnetisation_filename(component)
+                         for d in self.data_readers]
+            self._stacked[key] = np.array(list(iter_load_arrays(filenames)))
+        return self._stacked[key]
+
+    def get_spectra_via_method_1(self, component):
+        """
+        Return a numpy array of shape (R, F) containing the power spectral
+        densities of the spatially averaged magnetisation (method 1) for
+        each run, computed in a single batched FFT.
+        """
+        m_vals = self.get_average_magnetisation(component)
+        psd = np.abs(np.fft.rfft(m_vals, axis=1))**2
+        # FIXME: We ignore the last element for now so that we can compare with the existing data.
+        return psd[:, :-1]
+
+    def get_spectra_via_method_2(self, component):
+        """
+        Return a numpy array of shape (R, F) containing the power spectral
+        densities of the spatially resolved magnetisation (method 2) for
+        each run.
+
+        The runs are processed one at a time while the data for the next
+        run is being loaded in the background, so at most the data of three
+        runs (the current one, the next one and the one being loaded) is
+        held in memory at any point.
+        """
+        filenames = [d.get_spatially_resolved_magnetisation_filename(component)
+                     for d in self.data_readers]
+        psds = []
+        for m_vals in iter_load_arrays(filenames, lookahead=1):
+            psd_full = np.abs(np.fft.rfft(m_vals, axis=0))**2
+            psds.append(np.mean(psd_full, axis=(1, 2)))
+        # FIXME: We ignore the last element for now so that we can compare with the existing data.
+        return np.array(psds)[:, :-1]
+
+    def get_peak_frequencies(self, component='y', method=1, num_peaks=1,
+                             fmin=None, fmax=None, unit='GHz', rel_height=0.0):
+        """
+        Return a numpy array of shape (R, num_peaks) with the frequencies of
+        the `num_peaks` strongest peaks in the power spectrum of each run.
+
+        Peaks are local maxima of the spectrum computed via `method` (1 or 2)
+        within the (optional) band `fmin <= f <= fmax`, where both bounds are
+        given in `unit` ('Hz' or 'GHz'). Local maxima whose power is below
+        `rel_height` times the maximum power of the run's spectrum are
+        ignored (which is useful to suppress spurious peaks due to spectral
+        leakage). In each row the peak frequencies are sorted in ascending
+        order; if a run has fewer than `num_peaks` peaks the remaining
+        entries are NaN.
+        """
+        if method == 1:
+            psd = self.get_spectra_via_method_1(component)
+        elif method == 2:
+            psd = self.get_spectra_via_method_2(component)
+        else:
+            raise ValueError("Argument 'method' must be 1 or 2. Got: '{}'".format(method))
+        freqs = self.get_fft_frequencies(unit=unit)
+
+        # Mask of all interior local maxima inside the requested band.
+        is_peak = np.zeros(psd.shape, dtype=bool)
+        is_peak[:, 1:-1] = (psd[:, 1:-1] > psd[:, :-2]) & (psd[:, 1:-1] >= psd[:, 2:])
+        is_peak &= (psd >= rel_height * psd.max(axis=1, keepdims=True))
+        if fmin is not None:
+            is_peak &= (freqs >= fmin)
+        if fmax is not None:
+            is_peak &= (freqs <= fmax)
+
+        # Select the strongest peaks of each run and sort them by frequency.
+        peak_power = np.where(is_peak, psd, -np.inf)
+        idx = np.argsort(-peak_power, axis=1, kind='stable')[:, :num_peaks]
+        found = np.take_along_axis(is_peak, idx, axis=1)
+        peak_freqs = np.where(found, freqs[idx], np.nan)
+        return np.sort(peak_freqs, axis=1)
+
+    def get_dispersion(self, component='y', method=1, num_peaks=1,
+                       fmin=None, fmax=None, unit='GHz', rel_height=0.0):
+        """
+        Return a pair `(params, peak_freqs)` containing the swept parameter
+        values and the corresponding peak frequencies of all runs (see
+        `get_peak_frequencies` for the meaning of the arguments), ready to
+        be plotted as a dispersion diagram.
+        """
+        peak_freqs = self.get_peak_frequencies(component=component, method=method,
+                                               num_peaks=num_peaks, fmin=fmin,
+                                               fmax=fmax, unit=unit,
+                                               rel_height=rel_height)
+        return self.params, peak_freqs
@@ -0,0 +1,234 @@
+"""
+Streaming computation of spectra and eigenmodes.
+
+The class `SpectralAccumulator` consumes magnetisation snapshots one at a
+time (in the order in which they were sampled) and keeps only running
+quantities: the spatially averaged magnetisation, and the Fourier
+coefficients of the spatially resolved magnetisation at a user-chosen set
+of frequencies. Spectra and mode maps are therefore available at any
+point without having to store the full spatially resolved history.
+
+Snapshots can come from any source, e.g. `.omf` files written by OOMMF
+(see `iter_omf_snapshots` and `wait_for_files`), the output of Nmag's
+`nmagprobe` (see `iter_nmagprobe_snapshots`), or directly from a running
+simulation by passing `SpectralAccumulator.update` as a callback.
+"""
+
+import glob
+import numpy as np
+import os
+import time
+from data_reader import _convert_to_unit
+
+
+class SpectralAccumulator(object):
+    """
+    Running averaged magnetisation and per-cell Fourier coefficients.
+
+    Each snapshot is a numpy array of shape (3, nx, ny) containing the x/y/z
+    components of the magnetisation. The Fourier coefficients are defined
+    in the same way as for `DataReader`, i.e. as
+
+        c(f) = sum_n m(t_n) exp(-2 pi i f n dt)
+
+    so that for frequencies which lie on the FFT grid of the finished run
+    they agree with the coefficients returned by `numpy.fft.rfft`.
+
+    The methods mirror those of `DataReader` so that, once all snapshots
+    have been consumed, an accumulator can be used in its place (e.g. by
+    `EigenmodePlotter`) for the frequencies it tracks.
+    """
+    components = ['x', 'y', 'z']
+
+    def __init__(self, dt, freqs, t0=None):
+        """
+        Create an accumulator for snapshots sampled every `dt` seconds.
+
+        `freqs` is a sequence of frequencies (in Hz) at which the Fourier
+        coefficients of the spatially resolved magnetisation are tracked.
+        The time of the first snapshot is `t0` (default: `dt`, matching
+        the output of the OOMMF and Nmag scripts).
+        """
+        self.dt = dt
+        self.t0 = dt if t0 is None else t0
+        self.freqs = np.atleast_1d(np.asarray(freqs, dtype=float))
+        self.num_timesteps = 0
+        self._m_avg = []
+        self._coeffs = None
+
+    def update(self, m):
+        """
+        Add the next snapshot `m` (an array of shape (3, nx, ny)).
+        """
+        self.update_many(np.asarray(m)[np.newaxis])
+
+    def update_many(self, ms):
+        """
+        Add a block of consecutive snapshots `ms` (an array of shape
+        (B, 3, nx, ny)). This is equivalent to calling `update` for each
+        snapshot but processes the whole block in one vectorized step.
+        """
+        ms = np.asarray(ms, dtype=float)
+        if ms.ndim != 4 or ms.shape[1] != 3:
+            raise ValueError(
+                "Expected an array of shape (B, 3, nx, ny). Got: {}".format(ms.shape))
+        if self._coeffs is None:
+            self._coeffs = np.zeros((3, len(self.freqs)) + ms.shape[2:], dtype=complex)
+        elif ms.shape[2:] != self._coeffs.shape[2:]:
+            raise ValueError(
+                "Snapshot has grid shape {}, expected {}.".format(
+                    ms.shape[2:], self._coeffs.shape[2:]))
+
+        n = self.num_timesteps + np.arange(len(ms))
+        phasors = np.exp(-2j * np.pi * np.outer(n * self.dt, self.freqs))
+        self._coeffs += np.einsum('bk,bcxy->ckxy', phasors, ms)
+        self._m_avg.extend(ms.mean(axis=(2, 3)))
+        self.num_timesteps += len(ms)
+
+    def get_timesteps(self, unit='s'):
+        timesteps = self.t0 + self.dt * np.arange(self.num_timesteps)
+        return _convert_to_unit(timesteps, unit)
+
+    def get_num_timesteps(self):
+        return self.num_timesteps
+
+    def get_dt(self, unit='s'):
+        return _convert_to_unit(self.dt, unit)
+
+    def get_average_magnetisation(self, component):
+        """
+        Return a 1D numpy array containing the spatially averaged
+        magnetisation of all snapshots consumed so far.
+        """
+        idx = self.components.index(component)
+        return np.array(self._m_avg).reshape(-1, 3)[:, idx]
+
+    def get_fft_frequencies(self, unit='Hz'):
+        """
+        Return the FFT frequencies of the averaged magnetisation consumed
+        so far (see `DataReader.get_fft_frequencies`).
+        """
+        if unit == 'Hz':
+            timestep_unit = 's'
+        elif unit == 'GHz':
+            timestep_unit = 'ns'
+        else:
+            raise ValueError("Invalid unit: '{}'. Allowed values: 'Hz', 'GHz'".format(unit))
+        freqs = np.fft.rfftfreq(self.num_timesteps, self.get_dt(unit=timestep_unit))
+        # FIXME: We ignore the last element for now so that we can compare with the existing data.
+        return freqs[:-1]
+
+    def get_spectrum_via_method_1(self, component):
+        """
+        Return the power spectral density of the spatially averaged
+        magnetisation consumed so far (see `DataReader.get_spectrum_via_method_1`).
+        """
+        fft_data_avg = np.fft.rfft(self.get_average_magnetisation(component))
+        # FIXME: We ignore the last element for now so that we can compare with the existing data.
+        return (np.abs(fft_data_avg)**2)[:-1]
+
+    def get_spectrum_via_method_2(self, component):
+        """
+        Return the power spectral density of the spatially resolved
+        magnetisation (Eq. (5) in the paper) at the tracked frequencies
+        `self.freqs`.
+        """
+        idx = self.components.index(component)
+        return np.mean(np.abs(self._coeffs[idx])**2, axis=(1, 2))
+
+    def find_freq_index(self, f, rtol=1e-5):
+        """
+        Return the index of the tracked frequency closest to `f` (in Hz).
+
+        Raises an exception if no tracked frequency lies within a relative
+        distance `rtol` of `f`.
+        """
+        i = np.argmin(np.abs(self.freqs - f))
+        if np.abs(self.freqs[i] - f) > rtol * abs(f):
+            raise Exception("Frequency {} Hz is not tracked by this accumulator.".format(f))
+        return i
+
+    def get_FFT_coeffs_for_frequency(self, freq, component):
+        idx = self.find_freq_index(freq)
+        return self._coeffs[self.components.index(component), idx]
+
+    def get_FFT_coeffs_for_frequency_of_components(self, freq, components=('x', 'y', 'z')):
+        return [self.get_FFT_coeffs_for_frequency(freq, c) for c in components]
+
+    def get_mode_amplitudes(self, freq, component):
+        return np.absolute(self.get_FFT_coeffs_for_frequency(freq, component))
+
+    def get_mode_phases(self, freq, component):
+        return np.angle(self.get_FFT_coeffs_for_frequency(freq, component))
+
+
+def _is_complete_omf_file(filename):
+    """
+    Internal helper function to check whether an .omf file has been
+    completely written (i.e. ends with the 'End: Segment' line).
+    """
+    with open(filename, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(f.tell() - 64, 0))
+        return b'End: Segment' in f.read()
+
+
+def wait_for_files(pattern, num_files, poll_interval=1.0, is_complete=_is_complete_omf_file,
+                   timeout=None):
+    """
+    Yield the names of the `num_files` files matching the glob `pattern`
+    in sorted order, waiting for each one to appear and be completely
+    written (as determined by `is_complete`) if necessary.
+
+    This allows consuming the output of a simulation while it is running.
+    If `timeout` is given, a RuntimeError is raised when no further file
+    has become available for `timeout` seconds (e.g. because the
+    simulation has died).
+    """
+    yielded = 0
+    last_progress = time.time()
+    while yielded < num_files:
+        filenames = sorted(glob.glob(pattern))[yielded:num_files]
+        ready = 0
+        for filename in filenames:
+            if not is_complete(filename):
+                break
+            ready += 1
+            yield filename
+        yielded += ready
+        if yielded < num_files:
+            if ready > 0:
+                last_progress = time.time()
+            elif timeout is not None and time.time() - last_progress > timeout:
+                raise RuntimeError(
+                    "Timed out after {} s waiting for file {} of {} matching '{}'.".format(
+                        timeout, yielded + 1, num_files, pattern))
+            time.sleep(poll_interval)
+
+
+def iter_omf_snapshots(filenames, nx=24, ny=24):
+    """
+    Yield the magnetisation stored in each of the given (text-based)
+    OOMMF .omf files as an array of shape (3, nx, ny), averaged over
+    all layers in z-direction.
+    """
+    for filename in filenames:
+        d = np.loadtxt(filename)
+        yield d.reshape(-1, nx, ny, 3).mean(axis=0).transpose(2, 0, 1)
+
+
+def iter_nmagprobe_snapshots(filename, nx=24, ny=24):
+    """
+    Yield the magnetisation stored in the output file of Nmag's
+    `nmagprobe` tool (see `nmag_scripts/Makefile`) as arrays of
+    shape (3, nx, ny), one per sampled timestep.
+    """
+    values = []
+    with open(filename) as f:
+        for line in f:
+            if len(line) <= 5:
+                continue
+            values.append([float(v) for v in line.split(']')[0].split('[')[1].split()])
+            if len(values) == nx * ny:
+                yield np.array(values).T.reshape(3, nx, ny)
+                values = []
@@ -0,0 +1,103 @@
+import sys; sys.path.insert(0, '..')
+import numpy as np
+import os
+import shutil
+import tempfile
+import artifact_cache
+from artifact_cache import ArtifactCache, hash_arrays, hash_inputs
+
+
+def _write_file(filename, contents):
+    with open(filename, 'w') as f:
+        f.write(contents)
+
+
+def _read_file(filename):
+    with open(filename) as f:
+        return f.read()
+
+
+def test_hash_arrays():
+    a = np.arange(12.0).reshape(3, 4)
+    key = hash_arrays([a], params={'version': 1})
+    assert key == hash_arrays([a.copy()], params={'version': 1})
+    assert key == hash_arrays([np.asfortranarray(a)], params={'version': 1})
+    assert key != hash_arrays([a.reshape(4, 3)], params={'version': 1})
+    assert key != hash_arrays([a.astype(np.float32)], params={'version': 1})
+    assert key != hash_arrays([2 * a], params={'version': 1})
+    assert key != hash_arrays([a], params={'version': 2})
+
+
+class TestArtifactCache(object):
+    def setup_method(self, method):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = ArtifactCache(cache_dir=os.path.join(self.tmp_dir, 'cache'),
+                                   max_size=100)
+        self.work_dir = os.path.join(self.tmp_dir, 'work')
+        os.makedirs(self.work_dir)
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.tmp_dir)
+
+    def _path(self, filename):
+        return os.path.join(self.work_dir, filename)
+
+    def test_hash_depends_on_contents_only(self):
+        _write_file(self._path('a.mif'), 'alpha 1.0')
+        _write_file(self._path('b.mif'), 'alpha 1.0')
+        _write_file(self._path('c.mif'), 'alpha 0.5')
+        key_a = hash_inputs([self._path('a.mif')])
+        assert key_a == hash_inputs([self._path('b.mif')])
+        assert key_a != hash_inputs([self._path('c.mif')])
+        assert key_a != hash_inputs([self._path('a.mif')], params={'dt': 5e-12})
+
+    def test_store_and_fetch(self):
+        _write_file(self._path('relax.omf'), 'relaxed state')
+        key = 'abc'
+        assert not self.cache.fetch(key, ['relax.omf'], dest_dir=self.tmp_dir)
+
+        self.cache.store(key, [self._path('relax.omf')])
+        assert self.cache.contains(key)
+        assert self.cache.fetch(key, ['relax.omf'], dest_dir=self.tmp_dir)
+        assert _read_file(os.path.join(self.tmp_dir, 'relax.omf')) == 'relaxed state'
+
+    def test_evicts_least_recently_used_entries(self):
+        _write_file(self._path('relax.omf'), 'x' * 40)
+        self.cache.store('first', [self._path('relax.omf')])
+        self.cache.store('second', [self._path('relax.omf')])
+
+        # Make 'first' the most recently used entry.
+        entry_dir = os.path.join(self.cache.cache_dir, 'second')
+        os.utime(entry_dir, (0, 0))
+        assert self.cache.fetch('first', ['relax.omf'], dest_dir=self.tmp_dir)
+
+        self.cache.store('third', [self._path('relax.omf')])
+        assert self.cache.contains('first')
+        assert not self.cache.contains('second')
+        assert self.cache.contains('third')
+        assert self.cache.size() <= self.cache.max_size
+
+    def test_store_keeps_existing_entry(self):
+        _write_file(self._path('relax.omf'), 'relaxed state')
+        self.cache.store('abc', [self._path('relax.omf')])
+        # A second store of the same key (e.g. by a concurrent run with
+        # identical inputs) must neither fail nor replace the entry.
+        _write_file(self._path('relax.omf'), 'other state')
+        self.cache.store('abc', [self._path('relax.omf')])
+        assert self.cache.fetch('abc', ['relax.omf'], dest_dir=self.tmp_dir)
+        assert _read_file(os.path.join(self.tmp_dir, 'relax.omf')) == 'relaxed state'
+        assert os.listdir(self.cache.cache_dir) == ['abc']
+
+    def test_fetch_of_entry_evicted_while_copying_is_a_miss(self, monkeypatch):
+        _write_file(self._path('relax.omf'), 'relaxed state')
+        self.cache.store('abc', [self._path('relax.omf')])
+
+        copy = shutil.copy
+        def copy_after_eviction(src, dst):
+            shutil.rmtree(os.path.join(self.cache.cache_dir, 'abc'))
+            return copy(src, dst)
+        monkeypatch.setattr(artifact_cache.shutil, 'copy', copy_after_eviction)
+
+        assert not self.cache.fetch('abc', ['relax.omf'], dest_dir=self.tmp_dir)
+        assert self.cache.misses == 1
+        assert self.cache.entries() == []
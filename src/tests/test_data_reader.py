@@ -1,7 +1,10 @@
 import sys; sys.path.insert(0, '..')
 import numpy as np
 import os
-from data_reader import DataReader
+import shutil
+import tempfile
+import data_reader as data_reader_module
+from data_reader import DataReader, iter_load_arrays, zoom_dft
 
 here = os.path.abspath(os.path.dirname(__file__))
 
@@ -75,3 +78,172 @@ class TestDataReader(object):
         freqs_GHz_expected = freqs_Hz_expected / 1e9
         assert np.allclose(freqs_Hz, freqs_Hz_expected[:-1])
         assert np.allclose(freqs_GHz, freqs_GHz_expected[:-1])
+
+
+class TestSpectralIndex(object):
+    def setup_method(self, method):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.tmp_dir, 'oommf')
+        shutil.copytree(os.path.join(here, 'sample_data', 'oommf'), self.data_dir)
+        self.data_reader = DataReader(self.data_dir, software='OOMMF')
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_build_spectral_index(self):
+        freqs = self.data_reader.get_fft_frequencies()
+        amps_expected = [self.data_reader.get_mode_amplitudes(f, 'y') for f in freqs]
+        phases_expected = [self.data_reader.get_mode_phases(f, 'y') for f in freqs]
+
+        self.data_reader.build_spectral_index(chunk_size=1)
+        index = np.load(os.path.join(self.data_dir, 'mys_rfft.npy'), mmap_mode='r')
+        assert index.shape == (4, 2, 2)
+        assert self.data_reader.get_spectral_index('y') is not None
+
+        for f, amps, phases in zip(freqs, amps_expected, phases_expected):
+            assert np.allclose(self.data_reader.get_mode_amplitudes(f, 'y'), amps)
+            assert np.allclose(self.data_reader.get_mode_phases(f, 'y'), phases)
+
+    def test_stale_spectral_index_is_ignored(self):
+        self.data_reader.build_spectral_index()
+        index_file = os.path.join(self.data_dir, 'mys_rfft.npy')
+        os.utime(index_file, (0, 0))
+        assert self.data_reader.get_spectral_index('y') is None
+
+    def test_index_of_replaced_source_with_older_mtime_is_ignored(self):
+        freq = self.data_reader.get_fft_frequencies()[1]
+        self.data_reader.build_spectral_index(['y'])
+        amps_old = self.data_reader.get_mode_amplitudes(freq, 'y')
+
+        # Replace the source with different data but an older timestamp
+        # (as done by e.g. `shutil.copy2`, `cp -p` or `rsync -a`).
+        source = os.path.join(self.data_dir, 'mys.npy')
+        replacement = os.path.join(self.tmp_dir, 'mys.npy')
+        np.save(replacement, 3 * np.load(source))
+        os.utime(replacement, (0, 0))
+        shutil.copy2(replacement, source)
+
+        assert self.data_reader.get_spectral_index('y') is None
+        assert np.allclose(self.data_reader.get_mode_amplitudes(freq, 'y'), 3 * amps_old)
+
+    def test_index_with_wrong_shape_is_ignored(self):
+        self.data_reader.build_spectral_index(['y'])
+        index_file = os.path.join(self.data_dir, 'mys_rfft.npy')
+        mtime = os.path.getmtime(index_file)
+        np.save(index_file, np.zeros((3, 2, 2), dtype=complex))
+        os.utime(index_file, (mtime, mtime))
+        assert self.data_reader.get_spectral_index('y') is None
+
+
+def test_iter_spatially_resolved_magnetisation():
+    data_reader = DataReader(os.path.join(here, 'sample_data', 'oommf'), software='OOMMF')
+    result = list(data_reader.iter_spatially_resolved_magnetisation(['z', 'x']))
+    assert [c for c, _ in result] == ['z', 'x']
+    for component, m in result:
+        assert np.allclose(m, data_reader.get_spatially_resolved_magnetisation(component))
+
+
+def test_get_FFT_coeffs_for_frequency_of_components():
+    data_reader = DataReader(os.path.join(here, 'sample_data', 'oommf'), software='OOMMF')
+    freq = data_reader.get_fft_frequencies()[1]
+    coeffs = data_reader.get_FFT_coeffs_for_frequency_of_components(freq)
+    for component, c in zip(['x', 'y', 'z'], coeffs):
+        assert np.allclose(c, data_reader.get_FFT_coeffs_for_frequency(freq, component))
+
+
+def test_get_FFT_coeffs_for_frequency_of_components_loads_one_component_ahead(monkeypatch):
+    data_reader = DataReader(os.path.join(here, 'sample_data', 'oommf'), software='OOMMF')
+    freq = data_reader.get_fft_frequencies()[1]
+    coeffs_expected = data_reader.get_FFT_coeffs_for_frequency_of_components(freq)
+
+    submitted = []
+    num_submitted_at_transform = []
+    rfft = np.fft.rfft
+
+    class CountingExecutor(data_reader_module.ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            submitted.append(args)
+            return super(CountingExecutor, self).submit(fn, *args, **kwargs)
+
+    def recording_rfft(a, **kwargs):
+        num_submitted_at_transform.append(len(submitted))
+        return rfft(a, **kwargs)
+
+    monkeypatch.setattr(data_reader_module, 'ThreadPoolExecutor', CountingExecutor)
+    monkeypatch.setattr(np.fft, 'rfft', recording_rfft)
+    coeffs = data_reader.get_FFT_coeffs_for_frequency_of_components(freq)
+    # Only the current and the next component have been requested.
+    assert num_submitted_at_transform == [2, 3, 3]
+    for c, c_expected in zip(coeffs, coeffs_expected):
+        assert np.allclose(c, c_expected)
+
+
+def test_zoom_dft():
+    x = np.random.RandomState(0).uniform(size=(50, 3))
+    dt = 5e-12
+    n = len(x)
+
+    # On the FFT grid the zoom spectrum agrees with the FFT.
+    freqs = np.fft.rfftfreq(n, dt)
+    X = zoom_dft(x, freqs[2], freqs[10], 9, dt)
+    assert np.allclose(X, np.fft.rfft(x, axis=0)[2:11])
+
+    # Off the grid it agrees with the direct evaluation of the DFT.
+    fs = np.linspace(1.23e9, 2.34e9, 17)
+    X = zoom_dft(x.T, fs[0], fs[-1], len(fs), dt, axis=1)
+    X_expected = np.exp(-2j * np.pi * np.outer(fs, np.arange(n)) * dt).dot(x)
+    assert np.allclose(X, X_expected.T)
+    assert np.allclose(zoom_dft(x, 1.5e9, 1.5e9, 1, dt)[0],
+                       np.exp(-2j * np.pi * 1.5e9 * dt * np.arange(n)).dot(x))
+
+
+def test_zoom_spectra():
+    data_reader = DataReader(os.path.join(here, 'sample_data', 'oommf'), software='OOMMF')
+    freqs = data_reader.get_fft_frequencies(unit='GHz')
+    fmin, fmax = freqs[0], freqs[-1]
+    assert np.allclose(data_reader.get_zoom_frequencies(fmin, fmax, len(freqs)), freqs)
+
+    psd1 = data_reader.get_zoom_spectrum_via_method_1('y', fmin, fmax, len(freqs), unit='GHz',
+                                                      subtract_mean=False)
+    psd2 = data_reader.get_zoom_spectrum_via_method_2('y', fmin, fmax, len(freqs), unit='GHz',
+                                                      subtract_mean=False)
+    assert np.allclose(psd1, data_reader.get_spectrum_via_method_1('y'))
+    assert np.allclose(psd2, data_reader.get_spectrum_via_method_2('y'))
+
+    # Subtracting the mean only changes the value at f = 0 on the FFT grid.
+    psd1 = data_reader.get_zoom_spectrum_via_method_1('y', fmin, fmax, len(freqs), unit='GHz')
+    psd2 = data_reader.get_zoom_spectrum_via_method_2('y', fmin, fmax, len(freqs), unit='GHz')
+    assert np.allclose(psd1[0], 0) and np.allclose(psd2[0], 0)
+    assert np.allclose(psd1[1:], data_reader.get_spectrum_via_method_1('y')[1:])
+    assert np.allclose(psd2[1:], data_reader.get_spectrum_via_method_2('y')[1:])
+
+    coeffs = data_reader.get_zoom_FFT_coeffs_of_spatially_resolved_m(
+        'x', 10e9, 20e9, 5, subtract_mean=False)
+    m = data_reader.get_spatially_resolved_magnetisation('x')
+    phasors = np.exp(-2j * np.pi * np.outer(np.linspace(10e9, 20e9, 5),
+                                            np.arange(len(m))) * data_reader.get_dt())
+    assert np.allclose(coeffs, np.tensordot(phasors, m, axes=1))
+
+
+def test_iter_load_arrays_with_lookahead(monkeypatch):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        filenames = [os.path.join(tmp_dir, 'm{}.npy'.format(i)) for i in range(10)]
+        for i, filename in enumerate(filenames):
+            np.save(filename, np.full(3, i))
+
+        started = []
+        load = np.load
+
+        def counting_load(filename, **kwargs):
+            started.append(filename)
+            return load(filename, **kwargs)
+
+        monkeypatch.setattr(np, 'load', counting_load)
+        for i, m in enumerate(iter_load_arrays(filenames, lookahead=1)):
+            assert np.all(m == i)
+            # Only the current and the next file have been requested.
+            assert len(started) <= i + 2
+        assert started == filenames
+    finally:
+        shutil.rmtree(tmp_dir)
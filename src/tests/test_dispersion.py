@@ -0,0 +1,72 @@
+import sys; sys.path.insert(0, '..')
+import numpy as np
+import os
+import shutil
+import tempfile
+from data_reader import DataReader
+from dispersion import compute_space_time_spectrum, get_dispersion, plot_dispersion
+
+N = 40
+DT = 5e-12
+CELLSIZE = 5e-9
+
+
+class TestDispersion(object):
+    def setup_method(self, method):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.ny, self.nx = 6, 8
+        self.f0 = 4 / (N * DT)  # on the FFT grid
+        self.k0 = 2 * np.pi * 2 / (self.nx * CELLSIZE)
+
+        ts = DT * np.arange(1, N + 1)
+        x = CELLSIZE * np.arange(self.nx)
+        phase = self.k0 * x[np.newaxis, np.newaxis, :] - 2 * np.pi * self.f0 * ts[:, np.newaxis, np.newaxis]
+        self.my = 0.01 * np.cos(phase) * np.ones((1, self.ny, 1))
+        np.savetxt(os.path.join(self.tmp_dir, 'dynamic_txyz.txt'),
+                   np.array([ts, np.ones(N), self.my.mean(axis=(1, 2)), np.zeros(N)]).T)
+        np.save(os.path.join(self.tmp_dir, 'mys.npy'), self.my)
+        self.data_reader = DataReader(self.tmp_dir, software='OOMMF')
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_compute_space_time_spectrum(self):
+        coeffs = compute_space_time_spectrum(self.data_reader, 'y', window='hann', chunk_size=1)
+        w = np.outer(np.hanning(self.ny), np.hanning(self.nx))
+        coeffs_expected = self.nx * self.ny * np.fft.ifft2(np.fft.rfft(self.my * w, axis=0), axes=(1, 2))
+        assert coeffs.shape == (N // 2 + 1, self.ny, self.nx)
+        assert np.allclose(coeffs, coeffs_expected)
+
+    def test_get_dispersion_finds_plane_wave(self):
+        freqs, k, power = get_dispersion(self.data_reader, 'y', direction='x',
+                                         cellsize=(CELLSIZE, CELLSIZE))
+        assert power.shape == (len(freqs), self.nx)
+        assert np.all(np.diff(k) > 0)
+        i, j = np.unravel_index(np.argmax(power), power.shape)
+        assert np.isclose(freqs[i], self.f0)
+        # The wave travels in +x-direction, so it must appear at positive k.
+        assert np.isclose(k[j], self.k0)
+
+        # There is no wave travelling in y-direction.
+        _, _, power_y = get_dispersion(self.data_reader, 'y', direction='y')
+        assert power_y.max() < 1e-20 * power.max()
+
+        fig = plot_dispersion(freqs, k, power)
+        assert len(fig.axes) == 1
+
+    def test_spectral_index_is_only_written_on_request(self):
+        coeffs = compute_space_time_spectrum(self.data_reader, 'y', chunk_size=1)
+        assert sorted(os.listdir(self.tmp_dir)) == ['dynamic_txyz.txt', 'mys.npy']
+
+        coeffs_indexed = compute_space_time_spectrum(self.data_reader, 'y', build_index=True)
+        assert os.path.isfile(os.path.join(self.tmp_dir, 'mys_rfft.npy'))
+        assert np.allclose(coeffs_indexed, coeffs)
+
+    def test_falls_back_to_in_memory_transform_if_index_cannot_be_written(self, monkeypatch):
+        def build_spectral_index(components, chunk_size):
+            raise OSError("Read-only file system")
+        monkeypatch.setattr(self.data_reader, 'build_spectral_index', build_spectral_index)
+
+        freqs, k, power = get_dispersion(self.data_reader, 'y', build_index=True)
+        i, j = np.unravel_index(np.argmax(power), power.shape)
+        assert np.isclose(freqs[i], self.f0)
@@ -0,0 +1,71 @@
+import sys; sys.path.insert(0, '..')
+import numpy as np
+import os
+import shutil
+import tempfile
+import fd_solver
+from artifact_cache import ArtifactCache
+from data_reader import DataReader
+
+
+def test_demag_tensor_of_single_cell():
+    N = fd_solver.demag_tensor((1, 1, 1), (5e-9, 5e-9, 5e-9))
+    for key in ['xx', 'yy', 'zz']:
+        assert np.isclose(N[key][0, 0, 0], 1.0 / 3)
+    for key in ['xy', 'xz', 'yz']:
+        assert np.isclose(N[key][0, 0, 0], 0.0)
+
+    N = fd_solver.demag_tensor((1, 1, 1), (5e-9, 5e-9, 1e-9))
+    assert np.isclose(N['xx'][0, 0, 0] + N['yy'][0, 0, 0] + N['zz'][0, 0, 0], 1.0)
+    assert N['zz'][0, 0, 0] > N['xx'][0, 0, 0]
+
+
+def test_uniform_state_of_thin_film():
+    sim = fd_solver.Simulation((2, 24, 24), fd_solver.CELL_SIZE, Ms=8e5, A=13e-12,
+                               alpha=0.008, H_ext=[0, 0, 0], m0=(0, 0, 1))
+    assert np.allclose(sim.exchange_field(sim.m), 0)
+
+    # The demag field of the out-of-plane magnetised film is close to -Ms.
+    H_demag = sim.demag_field(sim.m)
+    assert np.allclose(H_demag[:2].mean(axis=(1, 2, 3)), 0, atol=1e-6)
+    assert -8e5 < H_demag[2].mean() < -0.7 * 8e5
+
+
+def test_magnetisation_stays_normalised():
+    m0 = np.random.RandomState(0).uniform(-1, 1, size=(3, 2, 4, 4))
+    sim = fd_solver.Simulation((2, 4, 4), fd_solver.CELL_SIZE, Ms=8e5, A=13e-12,
+                               alpha=0.5, H_ext=[8e4, 0, 0], m0=m0)
+    sim.advance(1e-11)
+    assert np.isclose(sim.t, 1e-11)
+    assert np.allclose(np.sum(sim.m**2, axis=0), 1)
+
+
+def test_run_dynamic_stage_output_is_readable():
+    output_dir = tempfile.mkdtemp()
+    try:
+        fd_solver.run_dynamic_stage(output_dir, m0=(1, 1, 0), num_timesteps=3)
+        data_reader = DataReader(output_dir, software='OOMMF')
+        assert np.allclose(data_reader.get_timesteps(), [5e-12, 1e-11, 1.5e-11])
+        m = data_reader.get_spatially_resolved_magnetisation('y')
+        assert m.shape == (3, 24, 24)
+        assert np.allclose(m.mean(axis=(1, 2)), data_reader.get_average_magnetisation('y'))
+    finally:
+        shutil.rmtree(output_dir)
+
+
+def test_benchmark():
+    assert fd_solver.benchmark(num_steps=2, shape=(1, 4, 4)) > 0
+
+
+def test_relax_with_cache_that_evicts_everything(monkeypatch):
+    monkeypatch.setitem(fd_solver.RELAXATION_PARAMS, 'T', 1e-12)
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = ArtifactCache(cache_dir=cache_dir, max_size=1)
+        m = fd_solver.relax(cache=cache)
+        assert m.shape == (3, 2, 24, 24)
+        # Only the newly stored entry is left in the cache directory.
+        assert os.listdir(cache_dir) == [key for _, _, key in cache.entries()]
+        assert np.allclose(fd_solver.relax(cache=cache), m)
+    finally:
+        shutil.rmtree(cache_dir)
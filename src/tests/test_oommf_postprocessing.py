@@ -0,0 +1,56 @@
+import sys; sys.path.insert(0, '..'); sys.path.insert(0, '../oommf_scripts')
+import numpy as np
+import os
+import shutil
+import tempfile
+from oommf_postprocessing import extract_spatial_data, get_mesh_dimensions
+
+OVF_HEADER = """OOMMF: rectangular mesh v1.0
+Segment count: 1
+Begin: Segment
+Begin: Header
+meshtype: rectangular
+xnodes: {nx}
+ynodes: {ny}
+znodes: {nz}
+End: Header
+Begin: Data Text"""
+
+
+class TestOOMMFPostprocessing(object):
+    def setup_method(self, method):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.nx, self.ny, self.nz = 4, 3, 3
+        # Magnetisation in OOMMF order: x varies fastest, z slowest.
+        self.data = np.random.RandomState(0).uniform(
+            size=(5, self.nz * self.ny * self.nx, 3))
+        self.omf_files = []
+        for i, d in enumerate(self.data):
+            filename = os.path.join(self.tmp_dir, 'dynamic-{:07d}.omf'.format(i))
+            header = OVF_HEADER.format(nx=self.nx, ny=self.ny, nz=self.nz)
+            np.savetxt(filename, d, header=header, footer='End: Data Text\nEnd: Segment')
+            self.omf_files.append(filename)
+        self.prefix = os.path.join(self.tmp_dir, '')
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.tmp_dir)
+
+    def _load(self, filename):
+        return np.load(os.path.join(self.tmp_dir, filename))
+
+    def test_get_mesh_dimensions(self):
+        assert get_mesh_dimensions(self.omf_files[0]) == (4, 3, 3)
+
+    def test_layer_mean(self):
+        extract_spatial_data(self.omf_files, prefix=self.prefix)
+        mys = self._load('mys.npy')
+        assert mys.shape == (5, self.ny, self.nx)
+        mys_expected = self.data[:, :, 1].reshape(5, self.nz, self.ny, self.nx).mean(axis=1)
+        assert np.allclose(mys, mys_expected)
+
+    def test_single_layer_and_per_layer_output(self):
+        extract_spatial_data(self.omf_files, layer=2, per_layer=True, prefix=self.prefix)
+        mzs_expected = self.data[:, :, 2].reshape(5, self.nz, self.ny, self.nx)
+        assert np.allclose(self._load('mzs.npy'), mzs_expected[:, 2])
+        for k in range(self.nz):
+            assert np.allclose(self._load('mzs_layer{}.npy'.format(k)), mzs_expected[:, k])
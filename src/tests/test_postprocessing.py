@@ -0,0 +1,40 @@
+import sys; sys.path.insert(0, '..')
+import numpy as np
+import os
+from data_reader import DataReader
+from postprocessing import decimate_for_plot, make_figure2
+
+here = os.path.abspath(os.path.dirname(__file__))
+data_dir = os.path.join(here, '..', '..', 'data', 'oommf')
+
+
+def test_decimate_for_plot_keeps_short_data_unchanged():
+    x = np.linspace(0, 1, 100)
+    y = np.sin(10 * x)
+    x_dec, y_dec = decimate_for_plot(x, y, [0, 1], num_pixels=800)
+    assert x_dec is x
+    assert y_dec is y
+
+
+def test_decimate_for_plot_preserves_peaks():
+    x = np.linspace(0, 10, 1000001)
+    y = np.exp(-x) * np.sin(2 * np.pi * 37 * x)
+    y[123456] = 5.0  # isolated spike which must survive decimation
+
+    x_dec, y_dec = decimate_for_plot(x, y, [0, 5], num_pixels=800)
+    assert len(x_dec) <= 2 * 800 + 2
+    assert np.all(np.diff(x_dec) > 0)
+    assert x_dec[0] <= 0 and x_dec[-1] >= 5
+
+    visible = (x >= 0) & (x <= 5)
+    assert y_dec.max() == y[visible].max()
+    assert y_dec.min() == y[visible].min()
+
+
+def test_make_figure2_does_not_decimate_standard_data():
+    data_reader = DataReader(data_dir=data_dir, software='OOMMF')
+    fig = make_figure2(data_reader)
+    line1 = fig.axes[0].get_lines()[0]
+    line2 = fig.axes[1].get_lines()[0]
+    assert len(line1.get_xdata()) == data_reader.get_num_timesteps()
+    assert len(line2.get_xdata()) == len(data_reader.get_fft_frequencies())
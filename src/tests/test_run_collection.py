@@ -0,0 +1,114 @@
+import sys; sys.path.insert(0, '..')
+import numpy as np
+import os
+import pytest
+import shutil
+import tempfile
+import threading
+import weakref
+from data_reader import DataReader
+from run_collection import RunCollection
+
+N = 400
+DT = 5e-12
+
+
+def _write_run(data_dir, freq, n=N, dt=DT, shape=(3, 3)):
+    """
+    Write synthetic data for a run in which m_y oscillates at `freq`.
+    """
+    os.makedirs(data_dir)
+    ts = dt * np.arange(1, n + 1)
+    my = 0.01 * np.sin(2 * np.pi * freq * ts)
+    data_avg = np.array([ts, np.ones(n), my, np.zeros(n)]).T
+    np.savetxt(os.path.join(data_dir, 'dynamic_txyz.txt'), data_avg)
+
+    weights = np.linspace(0.5, 1.5, shape[0] * shape[1]).reshape(shape)
+    for component, m_avg in zip('xyz', data_avg[:, 1:].T):
+        np.save(os.path.join(data_dir, 'm{}s.npy'.format(component)),
+                m_avg[:, np.newaxis, np.newaxis] * weights)
+
+
+class TestRunCollection(object):
+    def setup_method(self, method):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.freqs = [5e9, 7.5e9, 10e9]
+        self.data_dirs = [os.path.join(self.tmp_dir, 'run{}'.format(i))
+                          for i in range(len(self.freqs))]
+        for data_dir, freq in zip(self.data_dirs, self.freqs):
+            _write_run(data_dir, freq)
+        self.runs = RunCollection(self.data_dirs, software='OOMMF',
+                                  params=[10, 20, 30])
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_stacked_data(self):
+        assert len(self.runs) == 3
+        assert self.runs.get_average_magnetisation('y').shape == (3, N)
+        assert self.runs.get_spatially_resolved_magnetisation('y').shape == (3, N, 3, 3)
+
+    def test_spectra_match_data_reader(self):
+        psd1 = self.runs.get_spectra_via_method_1('y')
+        psd2 = self.runs.get_spectra_via_method_2('y')
+        for i, data_dir in enumerate(self.data_dirs):
+            data_reader = DataReader(data_dir, software='OOMMF')
+            assert np.allclose(psd1[i], data_reader.get_spectrum_via_method_1('y'))
+            assert np.allclose(psd2[i], data_reader.get_spectrum_via_method_2('y'))
+
+    def test_get_dispersion(self):
+        for method in [1, 2]:
+            params, peak_freqs = self.runs.get_dispersion('y', method=method, unit='Hz')
+            assert np.allclose(params, [10, 20, 30])
+            assert peak_freqs.shape == (3, 1)
+            assert np.allclose(peak_freqs[:, 0], self.freqs)
+
+    def test_missing_peaks_are_nan(self):
+        peak_freqs = self.runs.get_peak_frequencies('y', num_peaks=2, rel_height=1e-6)
+        assert np.allclose(peak_freqs[:, 0], [5, 7.5, 10])
+        assert np.isnan(peak_freqs[:, 1]).all()
+
+    def test_incompatible_runs_are_rejected(self):
+        data_dir = os.path.join(self.tmp_dir, 'other_dt')
+        _write_run(data_dir, 5e9, dt=2 * DT)
+        with pytest.raises(ValueError):
+            RunCollection([self.data_dirs[0], data_dir], software='OOMMF')
+
+        data_dir = os.path.join(self.tmp_dir, 'other_grid')
+        _write_run(data_dir, 5e9, shape=(4, 4))
+        with pytest.raises(ValueError):
+            RunCollection([self.data_dirs[0], data_dir], software='OOMMF')
+
+
+def test_method_2_holds_only_a_few_runs_in_memory(monkeypatch):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        data_dirs = [os.path.join(tmp_dir, 'run{}'.format(i)) for i in range(10)]
+        for data_dir in data_dirs:
+            _write_run(data_dir, 5e9)
+        runs = RunCollection(data_dirs, software='OOMMF')
+
+        # Count the arrays which are being loaded or are still alive.
+        lock = threading.Lock()
+        in_memory = [0]
+        max_in_memory = [0]
+        load = np.load
+
+        def release():
+            with lock:
+                in_memory[0] -= 1
+
+        def counting_load(filename, **kwargs):
+            with lock:
+                in_memory[0] += 1
+                max_in_memory[0] = max(max_in_memory[0], in_memory[0])
+            m = load(filename, **kwargs)
+            weakref.finalize(m, release)
+            return m
+
+        monkeypatch.setattr(np, 'load', counting_load)
+        psd = runs.get_spectra_via_method_2('y')
+        assert psd.shape[0] == 10
+        assert max_in_memory[0] <= 3
+    finally:
+        shutil.rmtree(tmp_dir)
@@ -0,0 +1,86 @@
+import sys; sys.path.insert(0, '..')
+import numpy as np
+import os
+import pytest
+import shutil
+import tempfile
+from data_reader import DataReader
+from spectral_accumulator import SpectralAccumulator, iter_omf_snapshots, wait_for_files
+
+here = os.path.abspath(os.path.dirname(__file__))
+
+
+class TestSpectralAccumulator(object):
+    @classmethod
+    def setup_class(cls):
+        datafile = os.path.join(here, 'sample_data', 'oommf')
+        cls.data_reader = DataReader(datafile, software='OOMMF')
+        cls.freqs = cls.data_reader.get_fft_frequencies()
+        cls.snapshots = np.array(
+            [cls.data_reader.get_spatially_resolved_magnetisation(c) for c in 'xyz']
+        ).transpose(1, 0, 2, 3)
+
+        cls.acc = SpectralAccumulator(cls.data_reader.get_dt(), cls.freqs)
+        cls.acc.update(cls.snapshots[0])
+        cls.acc.update_many(cls.snapshots[1:4])
+        for m in cls.snapshots[4:]:
+            cls.acc.update(m)
+
+    def test_timesteps(self):
+        assert self.acc.get_num_timesteps() == 6
+        assert np.allclose(self.acc.get_timesteps(unit='ns'),
+                           self.data_reader.get_timesteps(unit='ns') + 0.005)
+        assert np.allclose(self.acc.get_fft_frequencies(), self.freqs)
+
+    def test_average_magnetisation_and_method_1(self):
+        for c in 'xyz':
+            m_full = self.data_reader.get_spatially_resolved_magnetisation(c)
+            m_avg = self.acc.get_average_magnetisation(c)
+            assert np.allclose(m_avg, m_full.mean(axis=(1, 2)))
+            assert np.allclose(self.acc.get_spectrum_via_method_1(c),
+                               np.abs(np.fft.rfft(m_avg))[:-1]**2)
+
+    def test_modes_and_method_2(self):
+        for c in 'xyz':
+            for f in self.freqs:
+                assert np.allclose(self.acc.get_mode_amplitudes(f, c),
+                                   self.data_reader.get_mode_amplitudes(f, c))
+                assert np.allclose(self.acc.get_FFT_coeffs_for_frequency(f, c),
+                                   self.data_reader.get_FFT_coeffs_for_frequency(f, c))
+            assert np.allclose(self.acc.get_spectrum_via_method_2(c),
+                               self.data_reader.get_spectrum_via_method_2(c))
+
+
+def test_iter_omf_snapshots():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        nx, ny, nz = 3, 2, 2
+        m = np.random.RandomState(0).uniform(size=(2, nz * nx * ny, 3))
+        for i in range(2):
+            filename = os.path.join(tmp_dir, 'dynamic-{:07d}.omf'.format(i))
+            np.savetxt(filename, m[i], header='Begin: Segment',
+                       footer='End: Data Text\nEnd: Segment')
+
+        filenames = list(wait_for_files(os.path.join(tmp_dir, '*.omf'), 2))
+        snapshots = list(iter_omf_snapshots(filenames, nx=nx, ny=ny))
+        assert len(snapshots) == 2
+        expected = 0.5 * (m[1, :nx * ny] + m[1, nx * ny:])
+        assert snapshots[1].shape == (3, nx, ny)
+        assert np.allclose(snapshots[1][1], expected[:, 1].reshape(nx, ny))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_wait_for_files_times_out():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp_dir, 'dynamic-0000000.omf')
+        with open(filename, 'w') as f:
+            f.write('# End: Segment\n')
+        files = wait_for_files(os.path.join(tmp_dir, '*.omf'), 2,
+                               poll_interval=0.01, timeout=0.05)
+        assert next(files) == filename
+        with pytest.raises(RuntimeError):
+            next(files)
+    finally:
+        shutil.rmtree(tmp_dir)
@@ -0,0 +1,40 @@
+import sys; sys.path.insert(0, '..')
+import numpy as np
+import os
+import shutil
+import tempfile
+from artifact_cache import ArtifactCache
+from transform_data import transform_data
+
+here = os.path.abspath(os.path.dirname(__file__))
+
+
+class TestTransformData(object):
+    def setup_method(self, method):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.tmp_dir, 'data')
+        shutil.copytree(os.path.join(here, 'sample_data', 'oommf'), self.data_dir)
+        self.cache = ArtifactCache(cache_dir=os.path.join(self.tmp_dir, 'cache'))
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_transform_data_is_cached(self):
+        assert transform_data(self.data_dir, cache=self.cache) == (0, 3)
+        assert transform_data(self.data_dir, cache=self.cache) == (3, 0)
+
+        mys = np.load(os.path.join(self.data_dir, 'mys.npy'))
+        ft_abs = np.load(os.path.join(self.data_dir, 'mys_ft_abs.npy'))
+        ft_abs_expected = np.abs(np.fft.fft(mys.reshape(len(mys), -1), axis=0)).T
+        assert np.allclose(ft_abs, ft_abs_expected)
+
+    def test_stale_outputs_are_recomputed(self):
+        transform_data(self.data_dir, cache=self.cache)
+
+        mys = 2 * np.load(os.path.join(self.data_dir, 'mys.npy'))
+        np.save(os.path.join(self.data_dir, 'mys.npy'), mys)
+        assert transform_data(self.data_dir, cache=self.cache) == (2, 1)
+
+        ft_abs = np.load(os.path.join(self.data_dir, 'mys_ft_abs.npy'))
+        ft_abs_expected = np.abs(np.fft.fft(mys.reshape(len(mys), -1), axis=0)).T
+        assert np.allclose(ft_abs, ft_abs_expected)
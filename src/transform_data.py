@@ -2,6 +2,12 @@
 
 import numpy as np
 import os
+from artifact_cache import ArtifactCache, hash_arrays
+from data_reader import iter_load_arrays
+
+# Bump this whenever the output of `spatial_fft` changes so that
+# previously cached results are no longer used.
+SPATIAL_FFT_VERSION = 1
 
 
 def fft(mx, dt=5e-12):
@@ -63,12 +69,19 @@ def get_mode_phases(data_reader, component, idx, shape):
     return amplitudes.reshape(shape)
 
 
-def spatial_fft(dataname):
-    """ Spatially averaged FFT as defined in Eqn. (5) """
+def spatial_fft(dataname, mys=None):
+    """
+    Spatially averaged FFT as defined in Eqn. (5)
+
+    If the data stored in `dataname` has already been loaded it can be
+    passed in as `mys` to avoid reading it again.
+    """
     ft_abs = []
     ft_phase = []
 
-    mys = np.load(dataname)
+    if mys is None:
+        mys = np.load(dataname)
+    mys = mys.reshape(mys.shape[0], -1)
     m, n = mys.shape
 
     for i in range(n):
@@ -80,18 +93,49 @@ def spatial_fft(dataname):
     np.save(dataname[:-4] + '_ft_phase.npy', np.array(ft_phase))
 
 
-def transform_data():
-    """ Helper function to spatially transform data for each direction"""
+def transform_data(data_dir='.', cache=None):
+    """
+    Helper function to spatially transform data for each direction.
+
+    The results are stored in an `ArtifactCache`, keyed by the contents of
+    the source files `m?s.npy` and the transform parameters. Existing
+    output files are therefore only re-used if their source data has not
+    changed; otherwise they are fetched from the cache or recomputed.
+
+    Each source is read only once: it is loaded in a background thread
+    (overlapping with the processing of the previous direction) and the
+    cache key is computed from the loaded data.
+
+    Returns a pair `(hits, misses)` with the number of cache hits/misses.
+    """
+    if cache is None:
+        cache = ArtifactCache()
+    hits, misses = cache.hits, cache.misses
+
+    sources = []
+    targets = []
     for direction in ["x", "y", "z"]:
-        source = 'm{}s.npy'.format(direction)
-        targetA = 'm{}s_ft_abs.npy'.format(direction)
-        targetB = 'm{}s_ft_phase.npy'.format(direction)
+        source = os.path.join(data_dir, 'm{}s.npy'.format(direction))
+        targetA = os.path.join(data_dir, 'm{}s_ft_abs.npy'.format(direction))
+        targetB = os.path.join(data_dir, 'm{}s_ft_phase.npy'.format(direction))
 
         if not os.path.isfile(source):
             raise IOError("Source file {} does not exist in the current "
                 " directory. Try running the Makefile".format(source))
-        if not os.path.isfile(targetA) or not os.path.isfile(targetB):
-            spatial_fft(source)
+        sources.append(source)
+        targets.append([targetA, targetB])
+
+    loaded = iter_load_arrays(sources, lookahead=1)
+    for source, data, (targetA, targetB) in zip(sources, loaded, targets):
+        key = hash_arrays([data], params={'transform': 'spatial_fft',
+                                          'version': SPATIAL_FFT_VERSION})
+        if not cache.fetch(key, [targetA, targetB], dest_dir=data_dir):
+            spatial_fft(source, data)
+            cache.store(key, [targetA, targetB])
+
+    hits, misses = cache.hits - hits, cache.misses - misses
+    print("transform_data: {} cache hit(s), {} miss(es)".format(hits, misses))
+    return hits, misses
 
 
 if __name__ == '__main__':